@@ -2,23 +2,40 @@
 Application Factory
 """
 
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import init_db
+from app.core.audit import start_audit_writer, stop_audit_writer
+from app.core.logs import AccessLogMiddleware, setup_logging, shutdown_logging
+from app.core.security import check_password_hashing
 from app.api import api_router
+from app.connectors.nginx_proxy_manager import close_shared_clients
+from app.connectors.port_scanner import close_http_client
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
+    setup_logging()
     await init_db()
+    elapsed_ms = await asyncio.get_running_loop().run_in_executor(None, check_password_hashing)
+    logger.info("bcrypt self-test (%d rounds): %.0f ms", settings.BCRYPT_ROUNDS, elapsed_ms)
+    start_audit_writer()
     yield
     # Shutdown
-    pass
+    await stop_audit_writer()
+    await close_shared_clients()
+    await close_http_client()
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
@@ -29,6 +46,7 @@ def create_app() -> FastAPI:
         description="API pour la gestion des firewalls, routes et ports sur Linux",
         version="1.0.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         docs_url="/api/docs",
         redoc_url="/api/redoc",
         openapi_url="/api/openapi.json"
@@ -43,6 +61,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # Access log (outermost, so timings cover the whole stack)
+    app.add_middleware(AccessLogMiddleware)
+    
     # Include API routes
     app.include_router(api_router, prefix="/api")
     
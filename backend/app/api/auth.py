@@ -6,18 +6,20 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import undefer
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.core.security import (
-    verify_password, 
+    averify_password,
     create_access_token, 
     get_current_user,
-    get_password_hash
+    aget_password_hash,
+    invalidate_user_cache
 )
 from app.core.config import settings
 from app.models.user import User
-from app.models.audit import AuditLog
+from app.core.audit import record_audit
 from app.schemas import Token, LoginRequest, UserResponse, UserPasswordUpdate
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -32,21 +34,21 @@ async def login(
     """Login and get access token"""
     # Find user
     result = await db.execute(
-        select(User).where(User.username == form_data.username)
+        select(User)
+        .options(undefer(User.hashed_password))
+        .where(User.username == form_data.username)
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await averify_password(form_data.password, user.hashed_password):
         # Log failed attempt
-        audit = AuditLog(
+        await record_audit(
             action="LOGIN_FAILED",
             resource_type="auth",
             description=f"Failed login attempt for user: {form_data.username}",
             ip_address=request.client.host if request.client else None,
             status="failed"
         )
-        db.add(audit)
-        await db.commit()
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -74,7 +76,7 @@ async def login(
     )
     
     # Log successful login
-    audit = AuditLog(
+    await record_audit(
         user_id=user.id,
         username=user.username,
         action="LOGIN",
@@ -83,8 +85,8 @@ async def login(
         ip_address=request.client.host if request.client else None,
         status="success"
     )
-    db.add(audit)
     await db.commit()
+    invalidate_user_cache(user.id)
     
     return Token(access_token=access_token, token_type="bearer")
 
@@ -98,11 +100,13 @@ async def login_json(
     """Login with JSON body"""
     # Find user
     result = await db.execute(
-        select(User).where(User.username == credentials.username)
+        select(User)
+        .options(undefer(User.hashed_password))
+        .where(User.username == credentials.username)
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await averify_password(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
@@ -127,6 +131,7 @@ async def login_json(
     )
     
     await db.commit()
+    invalidate_user_cache(user.id)
     
     return Token(access_token=access_token, token_type="bearer")
 
@@ -144,16 +149,21 @@ async def change_password(
     db: AsyncSession = Depends(get_db)
 ):
     """Change current user's password"""
-    if not verify_password(password_update.current_password, current_user.hashed_password):
+    result = await db.execute(
+        select(User)
+        .options(undefer(User.hashed_password))
+        .where(User.id == current_user.id)
+    )
+    user = result.scalar_one()
+    
+    if not await averify_password(password_update.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
     # Update password
-    result = await db.execute(select(User).where(User.id == current_user.id))
-    user = result.scalar_one()
-    user.hashed_password = get_password_hash(password_update.new_password)
+    user.hashed_password = await aget_password_hash(password_update.new_password)
     
     await db.commit()
     
@@ -163,11 +173,10 @@ async def change_password(
 @router.post("/logout")
 async def logout(
     request: Request,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(get_current_user)
 ):
     """Logout (for audit purposes - JWT tokens cannot be invalidated server-side)"""
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="LOGOUT",
@@ -176,7 +185,5 @@ async def logout(
         ip_address=request.client.host if request.client else None,
         status="success"
     )
-    db.add(audit)
-    await db.commit()
     
     return {"message": "Logged out successfully"}
@@ -3,18 +3,17 @@ Firewall API Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
 
-from app.core.database import get_db
+from app.core.audit import record_audit
 from app.core.security import require_permission, get_current_user
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.connectors import connector_manager, ConnectorStatus
 from app.schemas import (
     UFWRuleCreate, 
     IptablesRuleCreate, 
     FirewalldRuleCreate,
+    NftablesRuleCreate,
     FirewallRuleResponse,
     FirewallStatusResponse
 )
@@ -96,8 +95,7 @@ async def get_ufw_rules(
 async def add_ufw_rule(
     rule: UFWRuleCreate,
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Add a new UFW rule"""
     connector = connector_manager.get_connector("ufw")
@@ -105,7 +103,7 @@ async def add_ufw_rule(
     result = await connector.add_rule(rule.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -116,8 +114,6 @@ async def add_ufw_rule(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -132,8 +128,7 @@ async def add_ufw_rule(
 async def delete_ufw_rule(
     rule_id: str,
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Delete a UFW rule"""
     connector = connector_manager.get_connector("ufw")
@@ -141,7 +136,7 @@ async def delete_ufw_rule(
     success = await connector.delete_rule(rule_id)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="DELETE",
@@ -151,8 +146,6 @@ async def delete_ufw_rule(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     if not success:
         raise HTTPException(
@@ -163,18 +156,84 @@ async def delete_ufw_rule(
     return {"message": "Rule deleted successfully"}
 
 
+@router.post("/ufw/rules/bulk")
+async def bulk_add_ufw_rules(
+    rules: List[UFWRuleCreate],
+    request: Request,
+    current_user: User = Depends(require_permission("firewall:write"))
+):
+    """Add several UFW rules (applied in order, not atomic)"""
+    connector = connector_manager.get_connector("ufw")
+    
+    rule_dicts = [rule.model_dump() for rule in rules]
+    result = await connector.bulk_add_rules(rule_dicts)
+    
+    # Audit log
+    await record_audit(
+        user_id=current_user.id,
+        username=current_user.username,
+        action="CREATE",
+        resource_type="firewall_rule",
+        description=f"Added {len(rules)} UFW rules",
+        details={"rules": rule_dicts},
+        ip_address=request.client.host if request.client else None,
+        status="success" if result.get("success") else "failed",
+        error_message=result.get("error")
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("errors") or result.get("error", "Failed to add rules")
+        )
+    
+    return result
+
+
+@router.post("/ufw/rules/bulk-delete")
+async def bulk_delete_ufw_rules(
+    rule_ids: List[str],
+    request: Request,
+    current_user: User = Depends(require_permission("firewall:write"))
+):
+    """Delete several UFW rules by number"""
+    connector = connector_manager.get_connector("ufw")
+    
+    result = await connector.bulk_delete_rules(rule_ids)
+    
+    # Audit log
+    await record_audit(
+        user_id=current_user.id,
+        username=current_user.username,
+        action="DELETE",
+        resource_type="firewall_rule",
+        resource_id=",".join(rule_ids)[:100],
+        description=f"Deleted UFW rules #{', #'.join(rule_ids)}",
+        ip_address=request.client.host if request.client else None,
+        status="success" if result.get("success") else "failed",
+        error_message=result.get("error")
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("error", "Failed to delete rules")
+        )
+    
+    return result
+
+
 @router.post("/ufw/enable")
 async def enable_ufw(
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Enable UFW"""
     connector = connector_manager.get_connector("ufw")
     success = await connector.enable()
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="EXECUTE",
@@ -183,8 +242,6 @@ async def enable_ufw(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     return {"success": success}
 
@@ -192,15 +249,14 @@ async def enable_ufw(
 @router.post("/ufw/disable")
 async def disable_ufw(
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Disable UFW"""
     connector = connector_manager.get_connector("ufw")
     success = await connector.disable()
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="EXECUTE",
@@ -209,8 +265,6 @@ async def disable_ufw(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     return {"success": success}
 
@@ -257,8 +311,7 @@ async def get_iptables_rules(
 async def add_iptables_rule(
     rule: IptablesRuleCreate,
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Add a new iptables rule"""
     connector = connector_manager.get_connector("iptables")
@@ -266,7 +319,7 @@ async def add_iptables_rule(
     result = await connector.add_rule(rule.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -277,8 +330,6 @@ async def add_iptables_rule(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -289,12 +340,45 @@ async def add_iptables_rule(
     return result
 
 
+@router.post("/iptables/rules/bulk")
+async def bulk_add_iptables_rules(
+    rules: List[IptablesRuleCreate],
+    request: Request,
+    current_user: User = Depends(require_permission("firewall:write"))
+):
+    """Add several iptables rules atomically (all or none)"""
+    connector = connector_manager.get_connector("iptables")
+    
+    rule_dicts = [rule.model_dump() for rule in rules]
+    result = await connector.bulk_add_rules(rule_dicts)
+    
+    # Audit log
+    await record_audit(
+        user_id=current_user.id,
+        username=current_user.username,
+        action="CREATE",
+        resource_type="firewall_rule",
+        description=f"Added {len(rules)} iptables rules",
+        details={"rules": rule_dicts},
+        ip_address=request.client.host if request.client else None,
+        status="success" if result.get("success") else "failed",
+        error_message=result.get("error")
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("error", "Failed to add rules")
+        )
+    
+    return result
+
+
 @router.delete("/iptables/rules/{rule_id:path}")
 async def delete_iptables_rule(
     rule_id: str,
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Delete an iptables rule (rule_id format: table:chain:num)"""
     connector = connector_manager.get_connector("iptables")
@@ -302,7 +386,7 @@ async def delete_iptables_rule(
     success = await connector.delete_rule(rule_id)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="DELETE",
@@ -312,8 +396,6 @@ async def delete_iptables_rule(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     if not success:
         raise HTTPException(
@@ -365,8 +447,7 @@ async def get_firewalld_rules(
 async def add_firewalld_rule(
     rule: FirewalldRuleCreate,
     request: Request,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Add a new firewalld rule"""
     connector = connector_manager.get_connector("firewalld")
@@ -374,7 +455,7 @@ async def add_firewalld_rule(
     result = await connector.add_rule(rule.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -385,8 +466,6 @@ async def add_firewalld_rule(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -441,3 +520,71 @@ async def get_nftables_tables(
     """Get all nftables tables"""
     connector = connector_manager.get_connector("nftables")
     return await connector.get_tables()
+
+
+@router.post("/nftables/rules/bulk")
+async def bulk_add_nftables_rules(
+    rules: List[NftablesRuleCreate],
+    request: Request,
+    current_user: User = Depends(require_permission("firewall:write"))
+):
+    """Add several nftables rules in one atomic transaction"""
+    connector = connector_manager.get_connector("nftables")
+    
+    rule_dicts = [rule.model_dump() for rule in rules]
+    result = await connector.add_rules(rule_dicts)
+    
+    # Audit log
+    await record_audit(
+        user_id=current_user.id,
+        username=current_user.username,
+        action="CREATE",
+        resource_type="firewall_rule",
+        description=f"Added {len(rules)} nftables rules",
+        details={"rules": rule_dicts},
+        ip_address=request.client.host if request.client else None,
+        status="success" if result.get("success") else "failed",
+        error_message=result.get("error")
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("error", "Failed to add rules")
+        )
+    
+    return result
+
+
+@router.post("/nftables/rules/bulk-delete")
+async def bulk_delete_nftables_rules(
+    rule_ids: List[str],
+    request: Request,
+    current_user: User = Depends(require_permission("firewall:write"))
+):
+    """Delete several nftables rules in one atomic transaction (IDs: family:table:chain:handle)"""
+    connector = connector_manager.get_connector("nftables")
+    
+    result = await connector.delete_rules(rule_ids)
+    
+    # Audit log
+    await record_audit(
+        user_id=current_user.id,
+        username=current_user.username,
+        action="DELETE",
+        resource_type="firewall_rule",
+        resource_id=",".join(rule_ids)[:100],
+        description=f"Deleted {len(rule_ids)} nftables rules",
+        details={"rule_ids": rule_ids},
+        ip_address=request.client.host if request.client else None,
+        status="success" if result.get("success") else "failed",
+        error_message=result.get("error")
+    )
+    
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=result.get("error", "Failed to delete rules")
+        )
+    
+    return result
@@ -3,13 +3,11 @@ Network API Routes - Routes, Interfaces, IP Rules
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
 
-from app.core.database import get_db
+from app.core.audit import record_audit
 from app.core.security import require_permission
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.connectors import connector_manager, ConnectorStatus
 from app.schemas import RouteCreate, RuleCreate, RouteResponse, InterfaceResponse
 
@@ -74,8 +72,7 @@ async def get_routes(
 async def add_route(
     route: RouteCreate,
     request: Request,
-    current_user: User = Depends(require_permission("routes:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("routes:write"))
 ):
     """Add a new route"""
     connector = connector_manager.get_connector("network")
@@ -83,7 +80,7 @@ async def add_route(
     result = await connector.add_route(route.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -94,8 +91,6 @@ async def add_route(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -112,8 +107,7 @@ async def delete_route(
     gateway: Optional[str] = None,
     device: Optional[str] = None,
     table: str = "main",
-    current_user: User = Depends(require_permission("routes:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("routes:write"))
 ):
     """Delete a route"""
     connector = connector_manager.get_connector("network")
@@ -128,7 +122,7 @@ async def delete_route(
     success = await connector.delete_route(route)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="DELETE",
@@ -138,8 +132,6 @@ async def delete_route(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     if not success:
         raise HTTPException(
@@ -165,8 +157,7 @@ async def get_ip_rules(
 async def add_ip_rule(
     rule: RuleCreate,
     request: Request,
-    current_user: User = Depends(require_permission("routes:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("routes:write"))
 ):
     """Add a new IP routing rule"""
     connector = connector_manager.get_connector("network")
@@ -182,7 +173,7 @@ async def add_ip_rule(
     result = await connector.add_rule(rule_data)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -193,8 +184,6 @@ async def add_ip_rule(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -212,8 +201,7 @@ async def delete_ip_rule(
     to_addr: str = None,
     table: str = None,
     request: Request = None,
-    current_user: User = Depends(require_permission("routes:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("routes:write"))
 ):
     """Delete an IP routing rule"""
     connector = connector_manager.get_connector("network")
@@ -228,7 +216,7 @@ async def delete_ip_rule(
     success = await connector.delete_rule(rule)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="DELETE",
@@ -238,8 +226,6 @@ async def delete_ip_rule(
         ip_address=request.client.host if request.client else None,
         status="success" if success else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     if not success:
         raise HTTPException(
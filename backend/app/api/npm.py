@@ -3,13 +3,11 @@ Nginx Proxy Manager API Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
-from app.core.database import get_db
+from app.core.audit import record_audit
 from app.core.security import require_permission
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.connectors import connector_manager, ConnectorStatus
 from app.schemas import ProxyHostCreate, StreamCreate
 
@@ -64,8 +62,7 @@ async def get_proxy_host(
 async def create_proxy_host(
     host: ProxyHostCreate,
     request: Request,
-    current_user: User = Depends(require_permission("docker:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("docker:write"))
 ):
     """Create a new proxy host"""
     connector = connector_manager.get_connector("npm")
@@ -73,7 +70,7 @@ async def create_proxy_host(
     result = await connector.create_proxy_host(host.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -84,8 +81,6 @@ async def create_proxy_host(
         status="success" if "error" not in result else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if "error" in result:
         raise HTTPException(
@@ -100,8 +95,7 @@ async def create_proxy_host(
 async def delete_proxy_host(
     host_id: int,
     request: Request,
-    current_user: User = Depends(require_permission("docker:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("docker:write"))
 ):
     """Delete a proxy host"""
     connector = connector_manager.get_connector("npm")
@@ -109,7 +103,7 @@ async def delete_proxy_host(
     result = await connector.delete_proxy_host(host_id)
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="DELETE",
@@ -119,8 +113,6 @@ async def delete_proxy_host(
         ip_address=request.client.host if request.client else None,
         status="success" if "error" not in result else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     return result
 
@@ -138,8 +130,7 @@ async def get_streams(
 async def create_stream(
     stream: StreamCreate,
     request: Request,
-    current_user: User = Depends(require_permission("docker:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("docker:write"))
 ):
     """Create a new stream proxy"""
     connector = connector_manager.get_connector("npm")
@@ -147,7 +138,7 @@ async def create_stream(
     result = await connector.create_stream(stream.model_dump())
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -157,8 +148,6 @@ async def create_stream(
         ip_address=request.client.host if request.client else None,
         status="success" if "error" not in result else "failed"
     )
-    db.add(audit)
-    await db.commit()
     
     return result
 
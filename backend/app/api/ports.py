@@ -3,13 +3,11 @@ Port Scanning API Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
-from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict
 
-from app.core.database import get_db
+from app.core.audit import record_audit
 from app.core.security import require_permission
 from app.models.user import User
-from app.models.audit import AuditLog
 from app.connectors import connector_manager, ConnectorStatus
 from app.schemas import PortScanRequest, PortScanResult
 
@@ -46,14 +44,13 @@ async def get_public_ip(
 async def scan_ports(
     scan_request: PortScanRequest,
     request: Request,
-    current_user: User = Depends(require_permission("ports:scan")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("ports:scan"))
 ):
     """Scan ports on a target host"""
     connector = connector_manager.get_connector("portscanner")
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="EXECUTE",
@@ -63,8 +60,6 @@ async def scan_ports(
         ip_address=request.client.host if request.client else None,
         status="success"
     )
-    db.add(audit)
-    await db.commit()
     
     if scan_request.use_nmap:
         # Use nmap if requested
@@ -99,14 +94,13 @@ async def quick_scan(
 async def scan_public_ports(
     ports: Optional[List[int]] = None,
     request: Request = None,
-    current_user: User = Depends(require_permission("ports:scan")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("ports:scan"))
 ):
     """Scan open ports on the public IP"""
     connector = connector_manager.get_connector("portscanner")
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="EXECUTE",
@@ -115,8 +109,6 @@ async def scan_public_ports(
         ip_address=request.client.host if request.client else None,
         status="success"
     )
-    db.add(audit)
-    await db.commit()
     
     return await connector.scan_public_ports(ports)
 
@@ -209,8 +201,7 @@ async def block_port(
     protocol: str = "tcp",
     interface: Optional[str] = None,
     request: Request = None,
-    current_user: User = Depends(require_permission("firewall:write")),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(require_permission("firewall:write"))
 ):
     """Block a port, optionally on a specific interface
     
@@ -299,7 +290,7 @@ async def block_port(
         )
     
     # Audit log
-    audit = AuditLog(
+    await record_audit(
         user_id=current_user.id,
         username=current_user.username,
         action="CREATE",
@@ -315,8 +306,6 @@ async def block_port(
         status="success" if result.get("success") else "failed",
         error_message=result.get("error")
     )
-    db.add(audit)
-    await db.commit()
     
     if not result.get("success"):
         raise HTTPException(
@@ -8,7 +8,7 @@ from sqlalchemy import select
 from typing import List
 
 from app.core.database import get_db
-from app.core.security import get_current_admin, get_password_hash, get_current_user
+from app.core.security import get_current_admin, aget_password_hash, get_current_user, invalidate_user_cache
 from app.models.user import User
 from app.schemas import UserCreate, UserUpdate, UserResponse
 
@@ -81,7 +81,7 @@ async def create_user(
         username=user_data.username,
         email=user_data.email,
         full_name=user_data.full_name,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await aget_password_hash(user_data.password),
         role=user_data.role.value,
         is_active=True
     )
@@ -135,6 +135,7 @@ async def update_user(
             setattr(user, field, value)
     
     await db.commit()
+    invalidate_user_cache(user.id)
     await db.refresh(user)
     
     return user
@@ -164,6 +165,7 @@ async def delete_user(
     
     await db.delete(user)
     await db.commit()
+    invalidate_user_cache(user_id)
 
 
 @router.post("/{user_id}/reset-password")
@@ -183,7 +185,7 @@ async def reset_user_password(
             detail="User not found"
         )
     
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await aget_password_hash(new_password)
     await db.commit()
     
     return {"message": "Password reset successfully"}
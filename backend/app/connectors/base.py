@@ -3,10 +3,58 @@ Base Connector Class
 All connectors inherit from this base class
 """
 
+import os
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+
+
+CAP_NET_ADMIN = 12
+
+
+def _proc_cap_has_net_admin(field: str) -> bool:
+    """Whether CAP_NET_ADMIN is set in a capability line of /proc/self/status"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return bool(int(line.split()[1], 16) >> CAP_NET_ADMIN & 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return False
+
+
+@lru_cache(maxsize=None)
+def has_net_admin() -> bool:
+    """Whether this process itself can manage network/firewall state
+    
+    True when running as root or when CAP_NET_ADMIN is in the effective
+    capability set. Only meaningful for in-process calls (pyroute2,
+    libnftables): see subprocess_has_net_admin for launched tools.
+    """
+    return os.geteuid() == 0 or _proc_cap_has_net_admin("CapEff:")
+
+
+@lru_cache(maxsize=None)
+def subprocess_has_net_admin() -> bool:
+    """Whether tools launched by this process keep CAP_NET_ADMIN
+    
+    A non-root process loses its effective capabilities on execve unless
+    they are also ambient, so CapEff alone is not enough here.
+    """
+    return os.geteuid() == 0 or _proc_cap_has_net_admin("CapAmb:")
+
+
+def sudo_prefix() -> tuple[str, ...]:
+    """Command prefix for privileged tools: empty when sudo is not needed"""
+    return () if subprocess_has_net_admin() else ("sudo",)
+
+
+def root_prefix() -> tuple[str, ...]:
+    """Command prefix for commands that need root itself (e.g. writing /etc)"""
+    return () if os.geteuid() == 0 else ("sudo",)
 
 
 class ConnectorStatus(str, Enum):
@@ -74,7 +74,7 @@ class DockerConnector(BaseConnector):
             )
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             version = await loop.run_in_executor(None, lambda: self.client.version())
             
             return ConnectorInfo(
@@ -97,7 +97,7 @@ class DockerConnector(BaseConnector):
             return {"available": False, "error": "Docker client not initialized"}
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             info = await loop.run_in_executor(None, lambda: self.client.info())
             
             return {
@@ -118,7 +118,7 @@ class DockerConnector(BaseConnector):
             return []
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             containers = await loop.run_in_executor(
                 None, 
                 lambda: self.client.containers.list(all=all)
@@ -169,7 +169,7 @@ class DockerConnector(BaseConnector):
             return []
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             networks = await loop.run_in_executor(
                 None,
                 lambda: self.client.networks.list()
@@ -233,7 +233,7 @@ class DockerConnector(BaseConnector):
             return {"error": "Docker client not initialized"}
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             container = await loop.run_in_executor(
                 None,
                 lambda: self.client.containers.get(container_id)
@@ -249,7 +249,7 @@ class DockerConnector(BaseConnector):
             return "Docker client not initialized"
         
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             container = await loop.run_in_executor(
                 None,
                 lambda: self.client.containers.get(container_id)
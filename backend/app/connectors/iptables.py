@@ -3,11 +3,25 @@ iptables Connector
 """
 
 import asyncio
+import ipaddress
 import re
 import shutil
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
-from app.connectors.base import BaseFirewallConnector, ConnectorInfo, ConnectorStatus
+from app.connectors.base import BaseFirewallConnector, ConnectorInfo, ConnectorStatus, root_prefix, sudo_prefix
+
+
+@lru_cache(maxsize=4096)
+def _normalize_addr(addr: str) -> str:
+    """Canonical form of an address/CIDR, for comparison only (cached, rulesets repeat a lot)
+    
+    Values that are not IP networks (hostnames, "anywhere") are returned unchanged.
+    """
+    try:
+        return str(ipaddress.ip_network(addr, strict=False))
+    except ValueError:
+        return addr
 
 
 class IptablesConnector(BaseFirewallConnector):
@@ -29,22 +43,23 @@ class IptablesConnector(BaseFirewallConnector):
         self.iptables_path = shutil.which("iptables")
         self.iptables_save_path = shutil.which("iptables-save")
         self.iptables_restore_path = shutil.which("iptables-restore")
+        self._cmd_prefix_sudo = (*sudo_prefix(), self.iptables_path)
+        self._cmd_prefix_nosudo = (self.iptables_path,)
     
-    async def _run_command(self, *args, use_sudo: bool = True) -> tuple[int, str, str]:
-        """Run an iptables command"""
-        cmd = []
-        if use_sudo:
-            cmd.append("sudo")
-        cmd.append(self.iptables_path)
-        cmd.extend(args)
+    async def _run_command(self, *args, use_sudo: bool = True) -> tuple[int, bytes, bytes]:
+        """Run an iptables command
+        
+        Output is returned as raw bytes; callers decode only what they inspect.
+        """
+        prefix = self._cmd_prefix_sudo if use_sudo else self._cmd_prefix_nosudo
         
         process = await asyncio.create_subprocess_exec(
-            *cmd,
+            *prefix, *args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
         stdout, stderr = await process.communicate()
-        return process.returncode or 0, stdout.decode(), stderr.decode()
+        return process.returncode or 0, stdout, stderr
     
     async def check_availability(self) -> ConnectorInfo:
         """Check if iptables is available"""
@@ -59,7 +74,7 @@ class IptablesConnector(BaseFirewallConnector):
         try:
             returncode, stdout, stderr = await self._run_command("--version")
             if returncode == 0:
-                version_match = re.search(r'v(\d+\.\d+\.\d+)', stdout)
+                version_match = re.search(r'v(\d+\.\d+\.\d+)', stdout.decode())
                 version = version_match.group(1) if version_match else "unknown"
                 return ConnectorInfo(
                     name=self.name,
@@ -72,7 +87,7 @@ class IptablesConnector(BaseFirewallConnector):
                     name=self.name,
                     type=self.type,
                     status=ConnectorStatus.ERROR,
-                    message=stderr
+                    message=stderr.decode()
                 )
         except Exception as e:
             return ConnectorInfo(
@@ -92,7 +107,7 @@ class IptablesConnector(BaseFirewallConnector):
         for table in self.TABLES:
             returncode, stdout, stderr = await self._run_command("-t", table, "-L", "-n", "--line-numbers")
             if returncode == 0:
-                chains = self._parse_chains(stdout)
+                chains = self._parse_chains(stdout.decode())
                 status["tables"][table] = {
                     "chains": chains,
                     "rule_count": sum(len(c.get("rules", [])) for c in chains.values())
@@ -101,48 +116,50 @@ class IptablesConnector(BaseFirewallConnector):
         return status
     
     def _parse_chains(self, output: str) -> Dict[str, Any]:
-        """Parse iptables -L output into chains and rules"""
+        """Parse iptables -L output into chains and rules
+        
+        The output is split into one block per chain in a single pass, then
+        each block's header and rule lines are handled without regexes.
+        User-defined chains ("Chain NAME (N references)") have no policy.
+        """
         chains = {}
-        current_chain = None
-        
-        for line in output.strip().split('\n'):
-            # Chain header: Chain INPUT (policy ACCEPT)
-            chain_match = re.match(r'Chain (\w+) \(policy (\w+)', line)
-            if chain_match:
-                current_chain = chain_match.group(1)
-                chains[current_chain] = {
-                    "policy": chain_match.group(2),
-                    "rules": []
-                }
-                continue
+        
+        blocks = output.strip().split("\nChain ")
+        for i, block in enumerate(blocks):
+            if not i:
+                if not block.startswith("Chain "):
+                    continue
+                block = block[len("Chain "):]
+            
+            # Chain header: Chain INPUT (policy ACCEPT 0 packets, 0 bytes)
+            header, _, body = block.partition("\n")
+            name, _, rest = header.partition(" ")
+            policy = rest[len("(policy "):].split(None, 1)[0].rstrip(")") if rest.startswith("(policy ") else None
             
-            # Skip column headers
-            if line.startswith("num") or line.startswith("target") or not line.strip():
-                continue
+            rules = []
+            chains[name] = {
+                "policy": policy,
+                "rules": rules
+            }
             
-            # Parse rule
-            if current_chain and line.strip():
+            for line in body.split("\n"):
+                # Skip column headers
+                if not line or line.startswith("num") or line.startswith("target"):
+                    continue
+                
                 parts = line.split()
-                if len(parts) >= 4:
-                    rule = {
-                        "num": parts[0] if parts[0].isdigit() else None,
-                        "target": parts[1] if not parts[0].isdigit() else parts[1],
-                        "protocol": parts[2] if not parts[0].isdigit() else parts[2],
-                        "opt": parts[3] if not parts[0].isdigit() else parts[3],
-                        "source": parts[4] if len(parts) > 4 else "0.0.0.0/0",
-                        "destination": parts[5] if len(parts) > 5 else "0.0.0.0/0",
-                        "extra": " ".join(parts[6:]) if len(parts) > 6 else ""
-                    }
-                    if parts[0].isdigit():
-                        rule["num"] = parts[0]
-                        rule["target"] = parts[1]
-                        rule["protocol"] = parts[2]
-                        rule["opt"] = parts[3]
-                        rule["source"] = parts[4] if len(parts) > 4 else "0.0.0.0/0"
-                        rule["destination"] = parts[5] if len(parts) > 5 else "0.0.0.0/0"
-                        rule["extra"] = " ".join(parts[6:]) if len(parts) > 6 else ""
-                    
-                    chains[current_chain]["rules"].append(rule)
+                if len(parts) < 4:
+                    continue
+                
+                rules.append({
+                    "num": parts[0] if parts[0].isdigit() else None,
+                    "target": parts[1],
+                    "protocol": parts[2],
+                    "opt": parts[3],
+                    "source": parts[4] if len(parts) > 4 else "0.0.0.0/0",
+                    "destination": parts[5] if len(parts) > 5 else "0.0.0.0/0",
+                    "extra": " ".join(parts[6:]) if len(parts) > 6 else ""
+                })
         
         return chains
     
@@ -156,7 +173,7 @@ class IptablesConnector(BaseFirewallConnector):
             return []
         
         rules = []
-        chains = self._parse_chains(stdout)
+        chains = self._parse_chains(stdout.decode())
         
         for chain_name, chain_data in chains.items():
             for rule in chain_data.get("rules", []):
@@ -167,31 +184,13 @@ class IptablesConnector(BaseFirewallConnector):
         
         return rules
     
-    async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
-        """Add an iptables rule
-        
-        Args:
-            rule: Dictionary with keys:
-                - table: filter, nat, mangle, raw, security (default: filter)
-                - chain: INPUT, OUTPUT, FORWARD, etc.
-                - target: ACCEPT, DROP, REJECT, LOG, etc.
-                - protocol: tcp, udp, icmp, all
-                - source: source IP/network
-                - destination: destination IP/network
-                - dport: destination port
-                - sport: source port
-                - in_interface: input interface
-                - out_interface: output interface
-                - position: insert at position (optional)
-        """
+    def _build_rule_args(self, rule: Dict[str, Any]) -> List[str]:
+        """Build the iptables arguments for a rule (without the -t table part)"""
         args = []
         
-        table = rule.get("table", "filter")
         chain = rule.get("chain", "INPUT")
         position = rule.get("position")
         
-        args.extend(["-t", table])
-        
         if position:
             args.extend(["-I", chain, str(position)])
         else:
@@ -204,12 +203,12 @@ class IptablesConnector(BaseFirewallConnector):
         
         # Source
         source = rule.get("source")
-        if source and source != "0.0.0.0/0":
+        if source and _normalize_addr(source) != "0.0.0.0/0":
             args.extend(["-s", source])
         
         # Destination
         destination = rule.get("destination")
-        if destination and destination != "0.0.0.0/0":
+        if destination and _normalize_addr(destination) != "0.0.0.0/0":
             args.extend(["-d", destination])
         
         # Interfaces
@@ -234,13 +233,80 @@ class IptablesConnector(BaseFirewallConnector):
         target = rule.get("target", "ACCEPT")
         args.extend(["-j", target])
         
+        return args
+    
+    async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Add an iptables rule
+        
+        Args:
+            rule: Dictionary with keys:
+                - table: filter, nat, mangle, raw, security (default: filter)
+                - chain: INPUT, OUTPUT, FORWARD, etc.
+                - target: ACCEPT, DROP, REJECT, LOG, etc.
+                - protocol: tcp, udp, icmp, all
+                - source: source IP/network
+                - destination: destination IP/network
+                - dport: destination port
+                - sport: source port
+                - in_interface: input interface
+                - out_interface: output interface
+                - position: insert at position (optional)
+        """
+        table = rule.get("table", "filter")
+        args = ["-t", table, *self._build_rule_args(rule)]
+        
         # Execute
         returncode, stdout, stderr = await self._run_command(*args)
         
         if returncode == 0:
             return {"success": True, "message": "Rule added successfully"}
         else:
-            return {"success": False, "error": stderr.strip() or stdout.strip()}
+            return {"success": False, "error": (stderr.strip() or stdout.strip()).decode()}
+    
+    async def bulk_add_rules(self, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add several rules in one iptables-restore --noflush transaction
+        
+        Rules use the same format as add_rule and are all validated before
+        anything is applied. Each table is committed separately, so the
+        batch is only atomic within a table.
+        """
+        if not rules:
+            return {"success": True, "message": "No rules to add"}
+        
+        if not self.iptables_restore_path:
+            return {"success": False, "error": "iptables-restore not found in PATH"}
+        
+        by_table: Dict[str, List[str]] = {}
+        for rule in rules:
+            table = rule.get("table", "filter")
+            if table not in self.TABLES:
+                return {"success": False, "error": f"Invalid table: {table}"}
+            args = self._build_rule_args(rule)
+            # One rule per line: whitespace inside a value would split it
+            # into extra arguments or lines of the restore script
+            if any(not arg or any(c.isspace() for c in arg) for arg in args):
+                return {"success": False, "error": f"Invalid rule value in {rule}"}
+            by_table.setdefault(table, []).append(" ".join(args))
+        
+        # No chain declarations: with --noflush a ":CHAIN POLICY" line would
+        # reset the policy of existing built-in chains
+        script = "".join(
+            f"*{table}\n" + "".join(f"{line}\n" for line in lines) + "COMMIT\n"
+            for table, lines in by_table.items()
+        )
+        
+        process = await asyncio.create_subprocess_exec(
+            *sudo_prefix(), self.iptables_restore_path, "--noflush",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate(script.encode())
+        
+        if process.returncode == 0:
+            return {"success": True, "message": f"{len(rules)} rules added successfully"}
+        else:
+            return {"success": False, "error": (stderr.strip() or stdout.strip()).decode()}
     
     async def delete_rule(self, rule_id: str) -> bool:
         """Delete an iptables rule by ID (format: table:chain:num)"""
@@ -274,26 +340,47 @@ class IptablesConnector(BaseFirewallConnector):
         if not self.iptables_save_path:
             return False
         
-        process = await asyncio.create_subprocess_shell(
-            f"sudo {self.iptables_save_path} > {filepath}",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await process.communicate()
-        return process.returncode == 0
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *sudo_prefix(), self.iptables_save_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await process.communicate()
+            
+            # Don't clobber the saved rules with an empty dump
+            if process.returncode != 0 or not stdout:
+                return False
+            
+            # The dump goes through tee's stdin: no shell. Writing the file
+            # needs root, not just CAP_NET_ADMIN
+            process = await asyncio.create_subprocess_exec(
+                *root_prefix(), "tee", filepath,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            await process.communicate(stdout)
+            return process.returncode == 0
+        except Exception:
+            return False
     
     async def restore_rules(self, filepath: str = "/etc/iptables.rules") -> bool:
         """Restore rules from file"""
         if not self.iptables_restore_path:
             return False
         
-        process = await asyncio.create_subprocess_shell(
-            f"sudo {self.iptables_restore_path} < {filepath}",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await process.communicate()
-        return process.returncode == 0
+        try:
+            # iptables-restore reads the file itself, no shell redirection
+            process = await asyncio.create_subprocess_exec(
+                *sudo_prefix(), self.iptables_restore_path, filepath,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            await process.communicate()
+            return process.returncode == 0
+        except Exception:
+            return False
     
     async def set_policy(self, chain: str, policy: str, table: str = "filter") -> bool:
         """Set default policy for a chain"""
@@ -5,34 +5,273 @@ Network Connector - Routes and Interfaces
 import asyncio
 import re
 import shutil
+import socket
 from typing import List, Dict, Any, Optional
 
-from app.connectors.base import BaseNetworkConnector, ConnectorInfo, ConnectorStatus
+import orjson
+
+try:
+    from pyroute2 import IPRoute
+except ImportError:
+    IPRoute = None
+
+from app.connectors.base import BaseNetworkConnector, ConnectorInfo, ConnectorStatus, sudo_prefix
+
+
+# Boundary between consecutive top-level arrays in `ip -j -batch` output
+_BATCH_SPLIT_RE = re.compile(rb'\]\s*\[')
+
+
+# ============ Netlink (pyroute2) read path ============
+# Lookup tables mirror the names iproute2 prints, so the netlink path
+# returns the same dict shapes as the `ip -j` parsers below.
+
+_ROUTE_TABLES = {"default": 253, "main": 254, "local": 255}
+_ROUTE_TABLE_NAMES = {v: k for k, v in _ROUTE_TABLES.items()}
+
+_SCOPES = {0: "global", 200: "site", 253: "link", 254: "host", 255: "nowhere"}
+
+_ROUTE_PROTOCOLS = {
+    0: "unspec", 1: "redirect", 2: "kernel", 3: "boot", 4: "static",
+    8: "gated", 9: "ra", 10: "mrt", 11: "zebra", 12: "bird", 16: "dhcp",
+    42: "babel", 186: "bgp", 187: "isis", 188: "ospf", 189: "rip", 192: "eigrp"
+}
+
+_ROUTE_TYPES = {
+    1: "unicast", 2: "local", 3: "broadcast", 4: "anycast", 5: "multicast",
+    6: "blackhole", 7: "unreachable", 8: "prohibit", 9: "throw", 10: "nat"
+}
+
+_ROUTE_FLAGS = ((0x01, "dead"), (0x04, "onlink"), (0x10, "linkdown"))
+
+_RULE_ACTIONS = {1: "lookup", 2: "goto", 3: "nop", 6: "blackhole", 7: "unreachable", 8: "prohibit"}
+
+_LINK_TYPES = {1: "ether", 768: "ipip", 772: "loopback", 776: "sit", 778: "gre", 65534: "none"}
+
+# Order follows iproute2's print_link_flags()
+_LINK_FLAGS = (
+    (0x8, "LOOPBACK"), (0x2, "BROADCAST"), (0x10, "POINTOPOINT"), (0x1000, "MULTICAST"),
+    (0x80, "NOARP"), (0x200, "ALLMULTI"), (0x100, "PROMISC"), (0x400, "MASTER"),
+    (0x800, "SLAVE"), (0x4, "DEBUG"), (0x8000, "DYNAMIC"), (0x20, "NOTRAILERS"),
+    (0x1, "UP"), (0x10000, "LOWER_UP")
+)
+
+_NUD_STATES = (
+    (0x01, "INCOMPLETE"), (0x02, "REACHABLE"), (0x04, "STALE"), (0x08, "DELAY"),
+    (0x10, "PROBE"), (0x20, "FAILED"), (0x40, "NOARP"), (0x80, "PERMANENT")
+)
+
+
+def _flag_names(value: int, table) -> List[str]:
+    return [name for bit, name in table if value & bit]
+
+
+def _prefix(addr: Optional[str], length: int, family: int, empty: str) -> str:
+    """Format an address/prefix the way iproute2 does (host prefixes bare)"""
+    if not addr or not length:
+        return empty
+    full = 32 if family == socket.AF_INET else 128
+    return addr if length == full else f"{addr}/{length}"
+
+
+def _link_names(ipr) -> Dict[int, str]:
+    return {link["index"]: link.get_attr("IFLA_IFNAME") for link in ipr.get_links()}
+
+
+def _nl_interfaces() -> List[Dict[str, Any]]:
+    with IPRoute() as ipr:
+        result = []
+        by_index: Dict[int, Dict[str, Any]] = {}
+        
+        for link in ipr.get_links():
+            flags = link["flags"]
+            names = _flag_names(flags, _LINK_FLAGS)
+            if flags & 0x1 and not flags & 0x10000:
+                names.insert(0, "NO-CARRIER")
+            info = {
+                "name": link.get_attr("IFLA_IFNAME"),
+                "index": link["index"],
+                "state": link.get_attr("IFLA_OPERSTATE") or "unknown",
+                "mtu": link.get_attr("IFLA_MTU"),
+                "mac": link.get_attr("IFLA_ADDRESS"),
+                "type": _LINK_TYPES.get(link["ifi_type"], str(link["ifi_type"])),
+                "flags": names,
+                "ipv4": [],
+                "ipv6": []
+            }
+            by_index[link["index"]] = info
+            result.append(info)
+        
+        for addr in ipr.get_addr():
+            info = by_index.get(addr["index"])
+            if info is None:
+                continue
+            addr_data = {
+                "address": addr.get_attr("IFA_LOCAL") or addr.get_attr("IFA_ADDRESS"),
+                "prefix": addr["prefixlen"],
+                "broadcast": addr.get_attr("IFA_BROADCAST"),
+                "scope": _SCOPES.get(addr["scope"], str(addr["scope"]))
+            }
+            if addr["family"] == socket.AF_INET:
+                info["ipv4"].append(addr_data)
+            elif addr["family"] == socket.AF_INET6:
+                info["ipv6"].append(addr_data)
+        
+        return result
+
+
+def _nl_routes(table_id: Optional[int]) -> List[Dict[str, Any]]:
+    """IPv4 routes of one table, or of all tables when table_id is None"""
+    with IPRoute() as ipr:
+        links = _link_names(ipr)
+        result = []
+        
+        for route in ipr.get_routes(family=socket.AF_INET):
+            route_table = route.get_attr("RTA_TABLE") or route["table"]
+            if table_id is not None and route_table != table_id:
+                continue
+            
+            dst = _prefix(route.get_attr("RTA_DST"), route["dst_len"], socket.AF_INET, "default")
+            dev = links.get(route.get_attr("RTA_OIF"))
+            table_name = _ROUTE_TABLE_NAMES.get(route_table, str(route_table))
+            scope = route["scope"]
+            proto = route["proto"]
+            result.append({
+                "id": f"{dst}@{dev or ''}@{table_name}" if table_id is None else f"{dst}@{dev or ''}",
+                "destination": dst,
+                "gateway": route.get_attr("RTA_GATEWAY"),
+                "device": dev,
+                # iproute2 does not print the default "boot" protocol
+                "protocol": _ROUTE_PROTOCOLS.get(proto, str(proto)) if proto != 3 else None,
+                "scope": _SCOPES.get(scope, str(scope)) if scope else None,
+                "metric": route.get_attr("RTA_PRIORITY"),
+                "type": _ROUTE_TYPES.get(route["type"], "unicast"),
+                "table": table_name,
+                "prefsrc": route.get_attr("RTA_PREFSRC"),
+                "flags": _flag_names(route["flags"], _ROUTE_FLAGS)
+            })
+        
+        return result
+
+
+def _nl_rules() -> List[Dict[str, Any]]:
+    with IPRoute() as ipr:
+        result = []
+        
+        for rule in ipr.get_rules(family=socket.AF_INET):
+            priority = rule.get_attr("FRA_PRIORITY") or 0
+            table = rule.get_attr("FRA_TABLE") or rule["table"]
+            fwmark = rule.get_attr("FRA_FWMARK")
+            result.append({
+                "id": str(priority),
+                "priority": priority,
+                "src": _prefix(rule.get_attr("FRA_SRC"), rule["src_len"], socket.AF_INET, "all"),
+                "dst": _prefix(rule.get_attr("FRA_DST"), rule["dst_len"], socket.AF_INET, None),
+                "table": _ROUTE_TABLE_NAMES.get(table, str(table)) if table else None,
+                "fwmark": hex(fwmark) if fwmark is not None else None,
+                "action": _RULE_ACTIONS.get(rule["action"], "lookup")
+            })
+        
+        return result
+
+
+def _nl_neighbours() -> List[Dict[str, Any]]:
+    with IPRoute() as ipr:
+        links = _link_names(ipr)
+        return [
+            {
+                "ip": neigh.get_attr("NDA_DST"),
+                "mac": neigh.get_attr("NDA_LLADDR"),
+                "device": links.get(neigh["ifindex"]),
+                "state": _flag_names(neigh["state"], _NUD_STATES)
+            }
+            for neigh in ipr.get_neighbours()
+            # `ip neigh show` hides NUD_NONE/NUD_NOARP entries by default
+            if neigh["state"] & ~0x40 & 0xFF
+        ]
+
+
+def _nl_counts() -> tuple[int, int, int]:
+    """Interface, main-table route and rule counts for get_status"""
+    with IPRoute() as ipr:
+        routes = sum(
+            1 for route in ipr.get_routes(family=socket.AF_INET)
+            if (route.get_attr("RTA_TABLE") or route["table"]) == 254
+        )
+        return len(ipr.get_links()), routes, len(ipr.get_rules(family=socket.AF_INET))
 
 
 class NetworkConnector(BaseNetworkConnector):
-    """Connector for Linux network management (ip command)"""
+    """Connector for Linux network management (ip command)
+    
+    Read paths talk netlink directly through pyroute2 when it is installed
+    (no subprocess, no sudo) and fall back to `ip -j` otherwise. Writes
+    always go through `sudo ip`.
+    """
     
     name = "iproute2"
     type = "network"
     
     def __init__(self):
         self.ip_path = shutil.which("ip")
+        self._cmd_prefix = (*sudo_prefix(), self.ip_path)
+        self._cmd_prefix_json = (*self._cmd_prefix, "-j")
     
-    async def _run_command(self, *args, use_json: bool = False) -> tuple[int, str, str]:
-        """Run an ip command"""
-        cmd = ["sudo", self.ip_path]
-        if use_json:
-            cmd.append("-j")
-        cmd.extend(args)
+    async def _run_command(self, *args, use_json: bool = False,
+                           input: Optional[bytes] = None) -> tuple[int, bytes, bytes]:
+        """Run an ip command
+        
+        Output is returned as raw bytes; callers decode only what they inspect
+        as text, JSON output goes straight to orjson. `input` is fed to stdin
+        (used by `-batch -`).
+        """
+        prefix = self._cmd_prefix_json if use_json else self._cmd_prefix
         
         process = await asyncio.create_subprocess_exec(
-            *cmd,
+            *prefix, *args,
+            stdin=asyncio.subprocess.PIPE if input is not None else None,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
-        return process.returncode or 0, stdout.decode(), stderr.decode()
+        stdout, stderr = await process.communicate(input)
+        return process.returncode or 0, stdout, stderr
+    
+    async def _netlink(self, func, *args) -> Optional[Any]:
+        """Run a blocking pyroute2 reader in a thread, None if unavailable/failed"""
+        if IPRoute is None:
+            return None
+        try:
+            return await asyncio.to_thread(func, *args)
+        except Exception:
+            return None
+    
+    async def _run_batch(self, *commands: str) -> Optional[List[Any]]:
+        """Run several ip commands in a single `ip -j -batch -` process
+        
+        Returns one parsed JSON array per command, or None if the batch
+        failed or its output could not be split per command.
+        """
+        script = "".join(f"{command}\n" for command in commands).encode()
+        returncode, stdout, stderr = await self._run_command(
+            "-batch", "-", use_json=True, input=script
+        )
+        
+        if returncode != 0:
+            return None
+        
+        chunks = _BATCH_SPLIT_RE.split(stdout.strip())
+        if len(chunks) != len(commands):
+            return None
+        
+        # Restore the brackets consumed by the split
+        last = len(chunks) - 1
+        try:
+            return [
+                orjson.loads((b"[" if i else b"") + chunk + (b"]" if i < last else b""))
+                for i, chunk in enumerate(chunks)
+            ]
+        except orjson.JSONDecodeError:
+            return None
     
     async def check_availability(self) -> ConnectorInfo:
         """Check if iproute2 is available"""
@@ -47,7 +286,7 @@ class NetworkConnector(BaseNetworkConnector):
         try:
             returncode, stdout, stderr = await self._run_command("-V")
             if returncode == 0:
-                version_match = re.search(r'iproute2-(\S+)', stdout)
+                version_match = re.search(r'iproute2-(\S+)', stdout.decode())
                 version = version_match.group(1) if version_match else "unknown"
                 return ConnectorInfo(
                     name=self.name,
@@ -60,7 +299,7 @@ class NetworkConnector(BaseNetworkConnector):
                     name=self.name,
                     type=self.type,
                     status=ConnectorStatus.ERROR,
-                    message=stderr
+                    message=stderr.decode()
                 )
         except Exception as e:
             return ConnectorInfo(
@@ -72,20 +311,33 @@ class NetworkConnector(BaseNetworkConnector):
     
     async def get_status(self) -> Dict[str, Any]:
         """Get network status"""
-        interfaces = await self.get_interfaces()
-        routes = await self.get_routes()
-        rules = await self.get_rules()
+        counts = await self._netlink(_nl_counts)
+        if counts is not None:
+            interface_count, route_count, rule_count = counts
+        else:
+            # Only counts are needed, so one batched ip call replaces three
+            sections = await self._run_batch("addr show", "route show table main", "rule show")
+            
+            if sections is not None:
+                interfaces, routes, rules = sections
+            else:
+                interfaces = await self.get_interfaces()
+                routes = await self.get_routes()
+                rules = await self.get_rules()
+            interface_count, route_count, rule_count = len(interfaces), len(routes), len(rules)
         
         return {
             "available": True,
-            "interface_count": len(interfaces),
-            "route_count": len(routes),
-            "rule_count": len(rules)
+            "interface_count": interface_count,
+            "route_count": route_count,
+            "rule_count": rule_count
         }
     
     async def get_interfaces(self) -> List[Dict[str, Any]]:
         """Get all network interfaces"""
-        import json
+        interfaces = await self._netlink(_nl_interfaces)
+        if interfaces is not None:
+            return interfaces
         
         returncode, stdout, stderr = await self._run_command("addr", "show", use_json=True)
         
@@ -93,44 +345,53 @@ class NetworkConnector(BaseNetworkConnector):
             return []
         
         try:
-            interfaces = json.loads(stdout)
+            interfaces = orjson.loads(stdout)
             result = []
             
             for iface in interfaces:
+                g = iface.get
+                ipv4: List[Dict[str, Any]] = []
+                ipv6: List[Dict[str, Any]] = []
                 info = {
-                    "name": iface.get("ifname"),
-                    "index": iface.get("ifindex"),
-                    "state": iface.get("operstate", "unknown"),
-                    "mtu": iface.get("mtu"),
-                    "mac": iface.get("address"),
-                    "type": iface.get("link_type"),
-                    "flags": iface.get("flags", []),
-                    "ipv4": [],
-                    "ipv6": []
+                    "name": g("ifname"),
+                    "index": g("ifindex"),
+                    "state": g("operstate", "unknown"),
+                    "mtu": g("mtu"),
+                    "mac": g("address"),
+                    "type": g("link_type"),
+                    "flags": g("flags", []),
+                    "ipv4": ipv4,
+                    "ipv6": ipv6
                 }
                 
-                for addr_info in iface.get("addr_info", []):
+                for addr_info in g("addr_info", []):
+                    ag = addr_info.get
                     addr_data = {
-                        "address": addr_info.get("local"),
-                        "prefix": addr_info.get("prefixlen"),
-                        "broadcast": addr_info.get("broadcast"),
-                        "scope": addr_info.get("scope")
+                        "address": ag("local"),
+                        "prefix": ag("prefixlen"),
+                        "broadcast": ag("broadcast"),
+                        "scope": ag("scope")
                     }
                     
-                    if addr_info.get("family") == "inet":
-                        info["ipv4"].append(addr_data)
-                    elif addr_info.get("family") == "inet6":
-                        info["ipv6"].append(addr_data)
+                    family = ag("family")
+                    if family == "inet":
+                        ipv4.append(addr_data)
+                    elif family == "inet6":
+                        ipv6.append(addr_data)
                 
                 result.append(info)
             
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     async def get_routes(self, table: str = "main") -> List[Dict[str, Any]]:
         """Get routing table"""
-        import json
+        table_id = _ROUTE_TABLES.get(table) or (int(table) if table.isdigit() else None)
+        if table_id is not None:
+            routes = await self._netlink(_nl_routes, table_id)
+            if routes is not None:
+                return routes
         
         returncode, stdout, stderr = await self._run_command(
             "route", "show", "table", table, use_json=True
@@ -140,32 +401,37 @@ class NetworkConnector(BaseNetworkConnector):
             return []
         
         try:
-            routes = json.loads(stdout)
+            routes = orjson.loads(stdout)
             result = []
             
             for route in routes:
+                g = route.get
+                dst = g("dst", "default")
+                dev = g("dev")
                 info = {
-                    "id": f"{route.get('dst', 'default')}@{route.get('dev', '')}",
-                    "destination": route.get("dst", "default"),
-                    "gateway": route.get("gateway"),
-                    "device": route.get("dev"),
-                    "protocol": route.get("protocol"),
-                    "scope": route.get("scope"),
-                    "metric": route.get("metric"),
-                    "type": route.get("type", "unicast"),
+                    "id": f"{dst}@{dev or ''}",
+                    "destination": dst,
+                    "gateway": g("gateway"),
+                    "device": dev,
+                    "protocol": g("protocol"),
+                    "scope": g("scope"),
+                    "metric": g("metric"),
+                    "type": g("type", "unicast"),
                     "table": table,
-                    "prefsrc": route.get("prefsrc"),
-                    "flags": route.get("flags", [])
+                    "prefsrc": g("prefsrc"),
+                    "flags": g("flags", [])
                 }
                 result.append(info)
             
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     async def get_all_routes(self) -> List[Dict[str, Any]]:
         """Get routes from all tables"""
-        import json
+        routes = await self._netlink(_nl_routes, None)
+        if routes is not None:
+            return routes
         
         all_routes = []
         
@@ -176,30 +442,36 @@ class NetworkConnector(BaseNetworkConnector):
         
         if returncode == 0:
             try:
-                routes = json.loads(stdout)
+                routes = orjson.loads(stdout)
                 for route in routes:
+                    g = route.get
+                    dst = g("dst", "default")
+                    dev = g("dev")
+                    route_table = g("table", "main")
                     info = {
-                        "id": f"{route.get('dst', 'default')}@{route.get('dev', '')}@{route.get('table', 'main')}",
-                        "destination": route.get("dst", "default"),
-                        "gateway": route.get("gateway"),
-                        "device": route.get("dev"),
-                        "protocol": route.get("protocol"),
-                        "scope": route.get("scope"),
-                        "metric": route.get("metric"),
-                        "type": route.get("type", "unicast"),
-                        "table": route.get("table", "main"),
-                        "prefsrc": route.get("prefsrc"),
-                        "flags": route.get("flags", [])
+                        "id": f"{dst}@{dev or ''}@{route_table}",
+                        "destination": dst,
+                        "gateway": g("gateway"),
+                        "device": dev,
+                        "protocol": g("protocol"),
+                        "scope": g("scope"),
+                        "metric": g("metric"),
+                        "type": g("type", "unicast"),
+                        "table": route_table,
+                        "prefsrc": g("prefsrc"),
+                        "flags": g("flags", [])
                     }
                     all_routes.append(info)
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 pass
         
         return all_routes
     
     async def get_rules(self) -> List[Dict[str, Any]]:
         """Get policy routing rules (ip rule)"""
-        import json
+        rules = await self._netlink(_nl_rules)
+        if rules is not None:
+            return rules
         
         returncode, stdout, stderr = await self._run_command("rule", "show", use_json=True)
         
@@ -207,23 +479,25 @@ class NetworkConnector(BaseNetworkConnector):
             return []
         
         try:
-            rules = json.loads(stdout)
+            rules = orjson.loads(stdout)
             result = []
             
             for rule in rules:
+                g = rule.get
+                priority = g("priority")
                 info = {
-                    "id": str(rule.get("priority", 0)),
-                    "priority": rule.get("priority"),
-                    "src": rule.get("src"),
-                    "dst": rule.get("dst"),
-                    "table": rule.get("table"),
-                    "fwmark": rule.get("fwmark"),
-                    "action": rule.get("action", "lookup")
+                    "id": str(priority if priority is not None else 0),
+                    "priority": priority,
+                    "src": g("src"),
+                    "dst": g("dst"),
+                    "table": g("table"),
+                    "fwmark": g("fwmark"),
+                    "action": g("action", "lookup")
                 }
                 result.append(info)
             
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     async def add_route(self, route: Dict[str, Any]) -> Dict[str, Any]:
@@ -271,7 +545,7 @@ class NetworkConnector(BaseNetworkConnector):
         if returncode == 0:
             return {"success": True, "message": "Route added successfully"}
         else:
-            return {"success": False, "error": stderr.strip() or stdout.strip()}
+            return {"success": False, "error": (stderr.strip() or stdout.strip()).decode()}
     
     async def delete_route(self, route: Dict[str, Any]) -> bool:
         """Delete a route
@@ -341,7 +615,7 @@ class NetworkConnector(BaseNetworkConnector):
         if returncode == 0:
             return {"success": True, "message": "Rule added successfully"}
         else:
-            return {"success": False, "error": stderr.strip() or stdout.strip()}
+            return {"success": False, "error": (stderr.strip() or stdout.strip()).decode()}
     
     async def delete_rule(self, rule: Dict[str, Any]) -> bool:
         """Delete a policy routing rule"""
@@ -369,7 +643,9 @@ class NetworkConnector(BaseNetworkConnector):
     
     async def get_arp_table(self) -> List[Dict[str, Any]]:
         """Get ARP table"""
-        import json
+        neighbors = await self._netlink(_nl_neighbours)
+        if neighbors is not None:
+            return neighbors
         
         returncode, stdout, stderr = await self._run_command("neigh", "show", use_json=True)
         
@@ -377,26 +653,25 @@ class NetworkConnector(BaseNetworkConnector):
             return []
         
         try:
-            neighbors = json.loads(stdout)
+            neighbors = orjson.loads(stdout)
             result = []
             
             for neigh in neighbors:
+                g = neigh.get
                 info = {
-                    "ip": neigh.get("dst"),
-                    "mac": neigh.get("lladdr"),
-                    "device": neigh.get("dev"),
-                    "state": neigh.get("state", [])
+                    "ip": g("dst"),
+                    "mac": g("lladdr"),
+                    "device": g("dev"),
+                    "state": g("state", [])
                 }
                 result.append(info)
             
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return []
     
     async def get_link_stats(self, interface: str) -> Dict[str, Any]:
         """Get interface statistics"""
-        import json
-        
         returncode, stdout, stderr = await self._run_command(
             "-s", "link", "show", interface, use_json=True
         )
@@ -405,9 +680,9 @@ class NetworkConnector(BaseNetworkConnector):
             return {}
         
         try:
-            data = json.loads(stdout)
+            data = orjson.loads(stdout)
             if data:
                 return data[0].get("stats64", data[0].get("stats", {}))
             return {}
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {}
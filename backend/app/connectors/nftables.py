@@ -3,12 +3,53 @@ nftables Connector
 """
 
 import asyncio
-import json
 import re
+import shlex
 import shutil
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 
-from app.connectors.base import BaseFirewallConnector, ConnectorInfo, ConnectorStatus
+import orjson
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # Python bindings for libnftables, shipped with nft (python3-nftables)
+    from nftables import Nftables
+except ImportError:
+    Nftables = None
+
+from app.connectors.base import BaseFirewallConnector, ConnectorInfo, ConnectorStatus, has_net_admin, root_prefix, sudo_prefix
+
+
+_VERSION_RE = re.compile(r'nftables v(\d+\.\d+\.\d+)')
+
+# Resolved once at import instead of probing PATH for every connector
+_NFT_PATH = shutil.which("nft")
+
+
+@dataclass
+class RulesetSnapshot:
+    """Tables, chains and rules from one walk of `nft -j list ruleset`"""
+    tables: List[Dict[str, Any]] = field(default_factory=list)
+    chains: List[Dict[str, Any]] = field(default_factory=list)
+    rules: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    available: bool = True
+    
+    def add(self, item: Dict[str, Any]):
+        """Classify one element of the top-level "nftables" array"""
+        if "rule" in item:
+            rule = item["rule"]
+            rule["id"] = str(len(self.rules))
+            self.rules.append(rule)
+        elif "chain" in item:
+            self.chains.append(item["chain"])
+        elif "table" in item:
+            self.tables.append(item["table"])
 
 
 class NftablesConnector(BaseFirewallConnector):
@@ -17,26 +58,82 @@ class NftablesConnector(BaseFirewallConnector):
     name = "nftables"
     type = "firewall"
     
+    # Seconds a parsed ruleset is reused across read calls
+    SNAPSHOT_TTL = 0.5
+    
     def __init__(self):
-        self.nft_path = shutil.which("nft")
+        self.nft_path = _NFT_PATH
+        self._snapshot_cache: Optional[RulesetSnapshot] = None
+        self._snapshot_ts = 0.0
+        self._snapshot_gen = 0
+        self._snapshot_lock = asyncio.Lock()
+        self._libnft: Any = None  # None: not tried yet, False: unavailable
+        self._libnft_lock = asyncio.Lock()
+    
+    def _get_libnft(self) -> Optional[Any]:
+        """Get the long-lived libnftables context, if it can be used
+        
+        Needs the nftables Python bindings and CAP_NET_ADMIN, since there is
+        no sudo in-process. Created once and kept for the connector lifetime.
+        """
+        if self._libnft is None:
+            self._libnft = False
+            if Nftables is not None and has_net_admin():
+                try:
+                    self._libnft = Nftables()
+                except Exception:
+                    pass
+        return self._libnft or None
     
-    async def _run_command(self, *args, use_json: bool = False) -> tuple[int, str, str]:
-        """Run an nft command"""
-        cmd = ["sudo", self.nft_path]
+    @staticmethod
+    def _libnft_run(ctx: Any, args: tuple, use_json: bool,
+                    input: Optional[bytes]) -> tuple[int, bytes, str]:
+        ctx.set_json_output(use_json)
+        if args == ("-f", "-"):
+            returncode, output, error = ctx.cmd(input.decode() if input else "")
+        elif args[0] == "-f":
+            returncode, output, error = ctx.cmd_from_file(args[1])
+        else:
+            # nft itself joins its argv with spaces into one command line
+            returncode, output, error = ctx.cmd(" ".join(args))
+        return returncode, output.encode(), error
+    
+    async def _run_command(self, *args, use_json: bool = False,
+                           input: Optional[bytes] = None) -> tuple[int, bytes, str]:
+        """Run an nft command
+        
+        Commands go through an in-process libnftables context when available,
+        so no process is spawned per call; otherwise nft is executed.
+        stdout is returned as raw bytes (rulesets can be large and orjson
+        parses bytes directly); stderr is small and decoded. `input` is fed
+        to stdin (used with `-f -`).
+        """
+        ctx = self._get_libnft() if args[0] != "--version" else None
+        if ctx is not None:
+            # The context is not thread-safe: one command at a time
+            async with self._libnft_lock:
+                return await asyncio.to_thread(self._libnft_run, ctx, args, use_json, input)
+        
+        cmd = [*sudo_prefix(), self.nft_path]
         if use_json:
             cmd.append("-j")
         cmd.extend(args)
         
         process = await asyncio.create_subprocess_exec(
             *cmd,
+            stdin=asyncio.subprocess.PIPE if input is not None else None,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
-        return process.returncode or 0, stdout.decode(), stderr.decode()
+        stdout, stderr = await process.communicate(input)
+        return process.returncode or 0, stdout, stderr.decode()
     
     async def check_availability(self) -> ConnectorInfo:
         """Check if nftables is available"""
+        if not self.nft_path:
+            # nft may have been installed after startup
+            self.nft_path = shutil.which("nft")
+        
         if not self.nft_path:
             return ConnectorInfo(
                 name=self.name,
@@ -48,7 +145,7 @@ class NftablesConnector(BaseFirewallConnector):
         try:
             returncode, stdout, stderr = await self._run_command("--version")
             if returncode == 0:
-                version_match = re.search(r'nftables v(\d+\.\d+\.\d+)', stdout)
+                version_match = _VERSION_RE.search(stdout.decode())
                 version = version_match.group(1) if version_match else "unknown"
                 return ConnectorInfo(
                     name=self.name,
@@ -71,87 +168,207 @@ class NftablesConnector(BaseFirewallConnector):
                 message=str(e)
             )
     
-    async def get_status(self) -> Dict[str, Any]:
-        """Get nftables status"""
-        returncode, stdout, stderr = await self._run_command("list", "ruleset", use_json=True)
+    async def _snapshot(self) -> RulesetSnapshot:
+        """Get tables, chains and rules from a single `nft -j list ruleset`
         
-        if returncode != 0:
-            return {"error": stderr, "available": False}
+        The parsed ruleset is walked once and reused for SNAPSHOT_TTL seconds
+        so back-to-back API handlers share it. Concurrent callers wait on one
+        in-flight nft call instead of each spawning their own. Mutating
+        methods invalidate it.
+        """
+        snapshot = self._cached_snapshot()
+        if snapshot is not None:
+            return snapshot
         
-        try:
-            ruleset = json.loads(stdout)
-            tables = []
+        async with self._snapshot_lock:
+            # Another caller may have refreshed it while we waited
+            snapshot = self._cached_snapshot()
+            if snapshot is not None:
+                return snapshot
             
-            for item in ruleset.get("nftables", []):
-                if "table" in item:
-                    tables.append(item["table"])
+            generation = self._snapshot_gen
+            if ijson is not None and self._get_libnft() is None:
+                snapshot = await self._stream_ruleset()
+            else:
+                snapshot = await self._load_ruleset()
+            
+            if snapshot.error:
+                # Errors are not cached
+                return snapshot
             
-            return {
-                "available": True,
-                "tables": tables,
-                "table_count": len(tables)
-            }
-        except json.JSONDecodeError:
-            return {"error": "Failed to parse nftables output", "available": True}
+            # Don't cache a ruleset read while a change was being applied
+            if generation == self._snapshot_gen:
+                self._snapshot_cache = snapshot
+                self._snapshot_ts = asyncio.get_running_loop().time()
+            return snapshot
     
-    async def get_rules(self) -> List[Dict[str, Any]]:
-        """Get all nftables rules"""
+    async def _load_ruleset(self) -> RulesetSnapshot:
+        """Read the whole JSON ruleset, then parse it with orjson"""
         returncode, stdout, stderr = await self._run_command("list", "ruleset", use_json=True)
         
         if returncode != 0:
-            return []
+            return RulesetSnapshot(error=stderr, available=False)
         
         try:
-            ruleset = json.loads(stdout)
-            rules = []
-            rule_id = 0
-            
-            for item in ruleset.get("nftables", []):
-                if "rule" in item:
-                    rule = item["rule"]
-                    rule["id"] = str(rule_id)
-                    rules.append(rule)
-                    rule_id += 1
-            
-            return rules
-        except json.JSONDecodeError:
-            return []
+            ruleset = orjson.loads(stdout)
+        except orjson.JSONDecodeError:
+            return RulesetSnapshot(error="Failed to parse nftables output")
+        
+        snapshot = RulesetSnapshot()
+        for item in ruleset.get("nftables", []):
+            snapshot.add(item)
+        return snapshot
     
-    async def get_tables(self) -> List[Dict[str, Any]]:
-        """Get all tables"""
-        returncode, stdout, stderr = await self._run_command("list", "tables", use_json=True)
+    async def _stream_ruleset(self) -> RulesetSnapshot:
+        """Parse `nft -j list ruleset` incrementally straight from the pipe
         
-        if returncode != 0:
-            return []
+        Items are classified as ijson yields them, so neither the full
+        output buffer nor a second full parse tree is ever held in memory.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *sudo_prefix(), self.nft_path, "-j", "list", "ruleset",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
         
+        # Read stderr alongside stdout so a full stderr pipe cannot stall nft
+        stderr_task = asyncio.create_task(process.stderr.read())
+        
+        snapshot = RulesetSnapshot()
+        parse_error = False
         try:
-            result = json.loads(stdout)
-            tables = []
-            for item in result.get("nftables", []):
-                if "table" in item:
-                    tables.append(item["table"])
-            return tables
-        except json.JSONDecodeError:
-            return []
+            try:
+                async for item in ijson.items(process.stdout, "nftables.item", use_float=True):
+                    snapshot.add(item)
+            except ijson.JSONError:
+                parse_error = True
+                # Drain the rest so nft can exit
+                await process.stdout.read()
+            
+            stderr = await stderr_task
+            await process.wait()
+        finally:
+            # Cancelled or failed mid-stream: don't leave nft running
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            stderr_task.cancel()
+        
+        if process.returncode != 0:
+            return RulesetSnapshot(error=stderr.decode(), available=False)
+        if parse_error:
+            return RulesetSnapshot(error="Failed to parse nftables output")
+        return snapshot
+    
+    def _cached_snapshot(self) -> Optional[RulesetSnapshot]:
+        if self._snapshot_cache is None:
+            return None
+        if asyncio.get_running_loop().time() - self._snapshot_ts >= self.SNAPSHOT_TTL:
+            return None
+        return self._snapshot_cache
+    
+    def _invalidate_snapshot(self):
+        """Drop the cached ruleset after a change"""
+        self._snapshot_ts = 0.0
+        self._snapshot_gen += 1
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Get nftables status"""
+        snapshot = await self._snapshot()
+        
+        if snapshot.error:
+            return {"error": snapshot.error, "available": snapshot.available}
+        
+        return {
+            "available": True,
+            "tables": list(snapshot.tables),
+            "table_count": len(snapshot.tables)
+        }
+    
+    async def get_rules(self) -> List[Dict[str, Any]]:
+        """Get all nftables rules"""
+        return list((await self._snapshot()).rules)
+    
+    async def get_tables(self) -> List[Dict[str, Any]]:
+        """Get all tables"""
+        return list((await self._snapshot()).tables)
     
     async def get_chains(self, table_family: str, table_name: str) -> List[Dict[str, Any]]:
         """Get all chains in a table"""
-        returncode, stdout, stderr = await self._run_command(
-            "list", "chains", table_family, table_name, use_json=True
-        )
+        return [
+            chain for chain in (await self._snapshot()).chains
+            if chain.get("family") == table_family and chain.get("table") == table_name
+        ]
+    
+    @staticmethod
+    def _rule_args(rule: Dict[str, Any]) -> Optional[List[str]]:
+        """Build the nft argv adding a rule, None if fields are missing
         
-        if returncode != 0:
-            return []
+        The expression is split in non-POSIX mode so quoted strings (e.g.
+        comments) keep their quotes, as nft expects them.
+        """
+        family = rule.get("family", "inet")
+        table = rule.get("table")
+        chain = rule.get("chain")
+        rule_expr = rule.get("rule")
+        position = rule.get("position")
         
+        if not table or not chain or not rule_expr:
+            return None
+        
+        lexer = shlex.shlex(rule_expr, posix=False)
+        lexer.whitespace_split = True
         try:
-            result = json.loads(stdout)
-            chains = []
-            for item in result.get("nftables", []):
-                if "chain" in item:
-                    chains.append(item["chain"])
-            return chains
-        except json.JSONDecodeError:
-            return []
+            expr = list(lexer)
+        except ValueError:
+            return None
+        
+        if position:
+            return ["insert", "rule", family, table, chain, "position", str(position), *expr]
+        return ["add", "rule", family, table, chain, *expr]
+    
+    @classmethod
+    def _rule_command(cls, rule: Dict[str, Any]) -> Optional[str]:
+        """Build the nft command line adding a rule (for `nft -f` batches)"""
+        args = cls._rule_args(rule)
+        return " ".join(args) if args is not None else None
+    
+    @staticmethod
+    def _delete_rule_args(rule_id: str) -> Optional[List[str]]:
+        """Build the nft argv deleting a rule by ID (family:table:chain:handle)"""
+        parts = rule_id.split(":")
+        if len(parts) != 4:
+            return None
+        
+        family, table, chain, handle = parts
+        return ["delete", "rule", family, table, chain, "handle", handle]
+    
+    @classmethod
+    def _delete_rule_command(cls, rule_id: str) -> Optional[str]:
+        """Build the nft command line deleting a rule (for `nft -f` batches)"""
+        args = cls._delete_rule_args(rule_id)
+        return " ".join(args) if args is not None else None
+    
+    async def apply_batch(self, cmds: List[str]) -> Dict[str, Any]:
+        """Apply several nft commands as one atomic transaction
+        
+        The commands are fed to a single `nft -f -`; if any of them fails,
+        the kernel rejects the whole batch.
+        """
+        if not cmds:
+            return {"success": True, "message": "Nothing to apply"}
+        
+        script = "".join(f"{cmd}\n" for cmd in cmds).encode()
+        returncode, stdout, stderr = await self._run_command("-f", "-", input=script)
+        self._invalidate_snapshot()
+        
+        if returncode == 0:
+            return {"success": True, "message": f"{len(cmds)} commands applied"}
+        else:
+            return {"success": False, "error": stderr.strip() or stdout.decode().strip()}
     
     async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
         """Add an nftables rule
@@ -164,48 +381,60 @@ class NftablesConnector(BaseFirewallConnector):
                 - rule: rule expression string
                 - position: handle to insert after (optional)
         """
-        family = rule.get("family", "inet")
-        table = rule.get("table")
-        chain = rule.get("chain")
-        rule_expr = rule.get("rule")
-        position = rule.get("position")
-        
-        if not all([table, chain, rule_expr]):
+        args = self._rule_args(rule)
+        if args is None:
             return {"success": False, "error": "Missing required fields: table, chain, rule"}
         
-        cmd = f"add rule {family} {table} {chain} {rule_expr}"
-        if position:
-            cmd = f"insert rule {family} {table} {chain} position {position} {rule_expr}"
-        
-        returncode, stdout, stderr = await self._run_command(cmd)
+        returncode, stdout, stderr = await self._run_command(*args)
+        self._invalidate_snapshot()
         
         if returncode == 0:
             return {"success": True, "message": "Rule added successfully"}
         else:
-            return {"success": False, "error": stderr.strip() or stdout.strip()}
+            return {"success": False, "error": stderr.strip() or stdout.decode().strip()}
+    
+    async def add_rules(self, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add several rules (same format as add_rule) in one transaction"""
+        cmds = []
+        for rule in rules:
+            cmd = self._rule_command(rule)
+            if cmd is None:
+                return {"success": False, "error": "Missing required fields: table, chain, rule"}
+            cmds.append(cmd)
+        
+        return await self.apply_batch(cmds)
     
     async def delete_rule(self, rule_id: str) -> bool:
         """Delete an nftables rule by handle
         
         rule_id format: family:table:chain:handle
         """
-        parts = rule_id.split(":")
-        if len(parts) != 4:
+        args = self._delete_rule_args(rule_id)
+        if args is None:
             return False
         
-        family, table, chain, handle = parts
-        
-        returncode, _, _ = await self._run_command(
-            "delete", "rule", family, table, chain, "handle", handle
-        )
+        returncode, _, _ = await self._run_command(*args)
+        self._invalidate_snapshot()
         
         return returncode == 0
     
+    async def delete_rules(self, rule_ids: List[str]) -> Dict[str, Any]:
+        """Delete several rules by ID in one transaction"""
+        cmds = []
+        for rule_id in rule_ids:
+            cmd = self._delete_rule_command(rule_id)
+            if cmd is None:
+                return {"success": False, "error": f"Invalid rule ID: {rule_id}"}
+            cmds.append(cmd)
+        
+        return await self.apply_batch(cmds)
+    
     async def add_table(self, family: str, name: str) -> Dict[str, Any]:
         """Create a new table"""
         returncode, stdout, stderr = await self._run_command(
             "add", "table", family, name
         )
+        self._invalidate_snapshot()
         
         if returncode == 0:
             return {"success": True, "message": f"Table {name} created"}
@@ -227,12 +456,13 @@ class NftablesConnector(BaseFirewallConnector):
             # Regular chain
             cmd = f"add chain {family} {table} {chain}"
         
-        returncode, stdout, stderr = await self._run_command(cmd)
+        # Sent as a script on stdin so the { ...; } block needs no quoting
+        result = await self.apply_batch([cmd])
         
-        if returncode == 0:
+        if result["success"]:
             return {"success": True, "message": f"Chain {chain} created"}
         else:
-            return {"success": False, "error": stderr.strip()}
+            return result
     
     async def enable(self) -> bool:
         """Enable nftables service"""
@@ -242,27 +472,32 @@ class NftablesConnector(BaseFirewallConnector):
             stderr=asyncio.subprocess.PIPE
         )
         await process.communicate()
+        self._invalidate_snapshot()
         return process.returncode == 0
     
     async def disable(self) -> bool:
         """Disable nftables (flush all rules)"""
         returncode, _, _ = await self._run_command("flush", "ruleset")
+        self._invalidate_snapshot()
         return returncode == 0
     
     async def save_rules(self, filepath: str = "/etc/nftables.conf") -> bool:
         """Save current ruleset to file"""
         returncode, stdout, stderr = await self._run_command("list", "ruleset")
         
-        if returncode != 0:
+        # Don't clobber the saved ruleset with an empty one
+        if returncode != 0 or not stdout:
             return False
         
         try:
-            process = await asyncio.create_subprocess_shell(
-                f"echo '{stdout}' | sudo tee {filepath}",
-                stdout=asyncio.subprocess.PIPE,
+            # The ruleset goes through tee's stdin: no shell, no argv size limit
+            process = await asyncio.create_subprocess_exec(
+                *root_prefix(), "tee", filepath,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE
             )
-            await process.communicate()
+            await process.communicate(stdout)
             return process.returncode == 0
         except Exception:
             return False
@@ -270,4 +505,5 @@ class NftablesConnector(BaseFirewallConnector):
     async def load_rules(self, filepath: str = "/etc/nftables.conf") -> bool:
         """Load ruleset from file"""
         returncode, _, _ = await self._run_command("-f", filepath)
+        self._invalidate_snapshot()
         return returncode == 0
@@ -3,84 +3,229 @@ Nginx Proxy Manager Connector
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional
+import ssl
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union
 import httpx
+import orjson
 
 from app.connectors.base import BaseConnector, ConnectorInfo, ConnectorStatus
 from app.core.config import settings
 
 
+# Output keys of the projected NPM objects; dicts built from these shared
+# tuples reuse the same key objects (and their cached hashes)
+_HOST_KEYS = (
+    "id", "domain_names", "forward_host", "forward_port", "forward_scheme",
+    "ssl_enabled", "enabled", "access_list_id", "advanced_config", "meta"
+)
+_STREAM_KEYS = (
+    "id", "incoming_port", "forwarding_host", "forwarding_port",
+    "tcp_forwarding", "udp_forwarding", "enabled"
+)
+_PROXY_PORT_KEYS = ("type", "domain", "forward_host", "forward_port", "ssl")
+_STREAM_PORT_KEYS = ("type", "incoming_port", "forward_host", "forward_port", "tcp", "udp")
+
+# Hosts whose certificate is not verified when no CA bundle is configured
+_LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+# HTTP clients shared by all connector instances, one per NPM base URL and
+# CA bundle, so connections (and their TLS sessions) are reused across requests
+_shared_clients: Dict[Tuple[str, Optional[str]], httpx.AsyncClient] = {}
+_clients_lock = asyncio.Lock()
+
+
+@lru_cache(maxsize=None)
+def _ssl_context(ca_bundle: Optional[str], verify: bool) -> ssl.SSLContext:
+    """Build (once) the SSL context for a CA bundle, system CAs if None"""
+    context = ssl.create_default_context(cafile=ca_bundle)
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+async def _get_shared_client(base_url: str, ca_bundle: Optional[str] = None) -> httpx.AsyncClient:
+    key = (base_url, ca_bundle)
+    client = _shared_clients.get(key)
+    if client is not None and not client.is_closed:
+        return client
+    
+    async with _clients_lock:
+        client = _shared_clients.get(key)
+        if client is None or client.is_closed:
+            # A local NPM typically serves a self-signed certificate
+            verify = bool(ca_bundle) or httpx.URL(base_url).host not in _LOCAL_HOSTS
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+                timeout=30.0,
+                verify=_ssl_context(ca_bundle, verify)
+            )
+            _shared_clients[key] = client
+        return client
+
+
+async def close_shared_clients():
+    """Close all shared NPM HTTP clients (called on application shutdown)"""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
 class NginxProxyManagerConnector(BaseConnector):
     """Connector for Nginx Proxy Manager API"""
     
     name = "nginx-proxy-manager"
     type = "proxy"
     
-    def __init__(self, base_url: Optional[str] = None, email: Optional[str] = None, password: Optional[str] = None):
+    # Refresh the token this many seconds before NPM says it expires
+    TOKEN_REFRESH_MARGIN = 30.0
+    
+    # Lifetime in seconds of cached read-only GET responses
+    CACHE_TTL = 2.0
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        ca_bundle: Optional[str] = None
+    ):
         self.base_url = (base_url or settings.NPM_URL).rstrip('/')
         self.email = email or settings.NPM_EMAIL
         self.password = password or settings.NPM_PASSWORD
+        self.ca_bundle = ca_bundle or settings.NPM_CA_BUNDLE or None
         self.token = None
-        self._client = None
+        self._token_deadline = 0.0
+        self._auth_lock = asyncio.Lock()
+        self._get_cache: Dict[str, Tuple[bytes, float]] = {}
     
     async def _get_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client"""
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                base_url=self.base_url,
-                timeout=30.0,
-                verify=False  # NPM often uses self-signed certs
-            )
-        return self._client
+        """Get the HTTP client shared by all connectors for this NPM instance"""
+        return await _get_shared_client(self.base_url, self.ca_bundle)
+    
+    def _token_valid(self) -> bool:
+        """Check whether the current token is still comfortably within its lifetime"""
+        return (
+            self.token is not None
+            and asyncio.get_running_loop().time() < self._token_deadline - self.TOKEN_REFRESH_MARGIN
+        )
     
-    async def _authenticate(self) -> bool:
-        """Authenticate with NPM API"""
+    @staticmethod
+    def _token_deadline_from(expires: Optional[str]) -> float:
+        """Convert NPM's ISO 'expires' timestamp to an event-loop deadline"""
+        if not expires:
+            return float("inf")
+        try:
+            expires_at = datetime.fromisoformat(expires.replace("Z", "+00:00"))
+        except ValueError:
+            return float("inf")
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        return asyncio.get_running_loop().time() + remaining
+    
+    async def _authenticate(self, stale_token: Optional[str] = None) -> bool:
+        """Authenticate with NPM API
+        
+        Concurrent callers share a single login: whoever gets the lock first
+        refreshes the token and the others reuse it. stale_token is the token
+        a caller saw rejected, which must not be reused.
+        """
         if not self.base_url or not self.email or not self.password:
             return False
         
-        try:
-            client = await self._get_client()
-            response = await client.post(
-                "/api/tokens",
-                json={
-                    "identity": self.email,
-                    "secret": self.password
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.token = data.get("token")
+        async with self._auth_lock:
+            if self._token_valid() and (stale_token is None or self.token != stale_token):
                 return True
-            return False
-        except Exception:
-            return False
+            
+            try:
+                client = await self._get_client()
+                response = await client.post(
+                    "/api/tokens",
+                    json={
+                        "identity": self.email,
+                        "secret": self.password
+                    }
+                )
+                
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    self.token = data.get("token")
+                    self._token_deadline = self._token_deadline_from(data.get("expires"))
+                    return True
+                return False
+            except Exception:
+                return False
+    
+    @staticmethod
+    def _parse(content: bytes) -> Any:
+        """Parse an NPM response body ({} if empty or not JSON)"""
+        if not content:
+            return {}
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return {}
     
     async def _request(self, method: str, endpoint: str, **kwargs) -> Any:
         """Make an authenticated request to NPM API"""
-        if not self.token:
+        if method != "GET":
+            # Any write may change what the cached listings return
+            self._get_cache.clear()
+        
+        content = await self._request_raw(method, endpoint, **kwargs)
+        if isinstance(content, dict):
+            return content
+        return self._parse(content)
+    
+    async def _cached_get(self, endpoint: str, ttl: Optional[float] = None) -> Any:
+        """GET a read-only endpoint, reusing the response body for ttl seconds"""
+        now = asyncio.get_running_loop().time()
+        cached = self._get_cache.get(endpoint)
+        if cached is not None and now < cached[1]:
+            return self._parse(cached[0])
+        
+        content = await self._request_raw("GET", endpoint)
+        if isinstance(content, dict):
+            return content
+        
+        self._get_cache[endpoint] = (content, now + (self.CACHE_TTL if ttl is None else ttl))
+        return self._parse(content)
+    
+    async def _request_raw(self, method: str, endpoint: str, **kwargs) -> Union[bytes, Dict[str, Any]]:
+        """Make an authenticated request and return the body, or an error dict"""
+        if not self._token_valid():
             if not await self._authenticate():
                 return {"error": "Authentication failed"}
         
         client = await self._get_client()
-        headers = kwargs.pop("headers", {})
-        headers["Authorization"] = f"Bearer {self.token}"
+        token = self.token
         
         try:
-            response = await client.request(method, endpoint, headers=headers, **kwargs)
+            # The client is shared between instances, so the token is sent
+            # per request rather than stored on the client
+            response = await client.request(
+                method, endpoint, headers={"Authorization": f"Bearer {token}"}, **kwargs
+            )
             
             if response.status_code == 401:
-                # Token expired, re-authenticate
-                if await self._authenticate():
-                    headers["Authorization"] = f"Bearer {self.token}"
-                    response = await client.request(method, endpoint, headers=headers, **kwargs)
+                # Token revoked or expired early, re-authenticate
+                if await self._authenticate(stale_token=token):
+                    response = await client.request(
+                        method, endpoint, headers={"Authorization": f"Bearer {self.token}"}, **kwargs
+                    )
                 else:
                     return {"error": "Authentication failed"}
             
             if response.status_code >= 400:
                 return {"error": response.text, "status_code": response.status_code}
             
-            return response.json() if response.text else {}
+            return response.content
         except Exception as e:
             return {"error": str(e)}
     
@@ -133,9 +278,12 @@ class NginxProxyManagerConnector(BaseConnector):
             "authenticated": authenticated
         }
     
-    async def get_proxy_hosts(self) -> List[Dict[str, Any]]:
-        """Get all proxy hosts"""
-        result = await self._request("GET", "/api/nginx/proxy-hosts")
+    async def _get_list(self, endpoint: str, cached: bool = False) -> List[Dict[str, Any]]:
+        """GET a list endpoint as returned by NPM ([error] on failure)"""
+        if cached:
+            result = await self._cached_get(endpoint)
+        else:
+            result = await self._request("GET", endpoint)
         
         if isinstance(result, dict) and "error" in result:
             return [result]
@@ -143,23 +291,36 @@ class NginxProxyManagerConnector(BaseConnector):
         if not isinstance(result, list):
             return []
         
-        hosts = []
-        for host in result:
-            if isinstance(host, dict):
-                hosts.append({
-                    "id": host.get("id"),
-                    "domain_names": host.get("domain_names", []),
-                    "forward_host": host.get("forward_host"),
-                    "forward_port": host.get("forward_port"),
-                    "forward_scheme": host.get("forward_scheme", "http"),
-                    "ssl_enabled": host.get("ssl_forced", False) or bool(host.get("certificate_id")),
-                    "enabled": host.get("enabled", True),
-                    "access_list_id": host.get("access_list_id"),
-                    "advanced_config": host.get("advanced_config", ""),
-                    "meta": host.get("meta", {})
-                })
+        return result
+    
+    async def get_proxy_hosts(self) -> List[Dict[str, Any]]:
+        """Get all proxy hosts"""
+        result = await self._get_list("/api/nginx/proxy-hosts")
+        
+        if result and "error" in result[0]:
+            return result
         
-        return hosts
+        return [
+            self._project_host(host.get)
+            for host in result
+            if isinstance(host, dict)
+        ]
+    
+    @staticmethod
+    def _project_host(get) -> Dict[str, Any]:
+        """Project a raw NPM proxy host, given its bound .get"""
+        return dict(zip(_HOST_KEYS, (
+            get("id"),
+            get("domain_names", []),
+            get("forward_host"),
+            get("forward_port"),
+            get("forward_scheme", "http"),
+            get("ssl_forced", False) or bool(get("certificate_id")),
+            get("enabled", True),
+            get("access_list_id"),
+            get("advanced_config", ""),
+            get("meta", {})
+        )))
     
     async def get_proxy_host(self, host_id: int) -> Dict[str, Any]:
         """Get a specific proxy host"""
@@ -204,39 +365,33 @@ class NginxProxyManagerConnector(BaseConnector):
     
     async def get_redirection_hosts(self) -> List[Dict[str, Any]]:
         """Get all redirection hosts"""
-        result = await self._request("GET", "/api/nginx/redirection-hosts")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/nginx/redirection-hosts", cached=True)
     
     async def get_streams(self) -> List[Dict[str, Any]]:
         """Get all stream (TCP/UDP) proxies"""
-        result = await self._request("GET", "/api/nginx/streams")
+        result = await self._get_list("/api/nginx/streams")
         
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if not isinstance(result, list):
-            return []
-        
-        streams = []
-        for stream in result:
-            if isinstance(stream, dict):
-                streams.append({
-                    "id": stream.get("id"),
-                    "incoming_port": stream.get("incoming_port"),
-                    "forwarding_host": stream.get("forwarding_host"),
-                    "forwarding_port": stream.get("forwarding_port"),
-                    "tcp_forwarding": stream.get("tcp_forwarding", True),
-                    "udp_forwarding": stream.get("udp_forwarding", False),
-                    "enabled": stream.get("enabled", True)
-                })
+        if result and "error" in result[0]:
+            return result
         
-        return streams
+        return [
+            self._project_stream(stream.get)
+            for stream in result
+            if isinstance(stream, dict)
+        ]
+    
+    @staticmethod
+    def _project_stream(get) -> Dict[str, Any]:
+        """Project a raw NPM stream, given its bound .get"""
+        return dict(zip(_STREAM_KEYS, (
+            get("id"),
+            get("incoming_port"),
+            get("forwarding_host"),
+            get("forwarding_port"),
+            get("tcp_forwarding", True),
+            get("udp_forwarding", False),
+            get("enabled", True)
+        )))
     
     async def create_stream(self, stream: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new stream proxy"""
@@ -252,92 +407,62 @@ class NginxProxyManagerConnector(BaseConnector):
     
     async def get_certificates(self) -> List[Dict[str, Any]]:
         """Get all SSL certificates"""
-        result = await self._request("GET", "/api/nginx/certificates")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/nginx/certificates", cached=True)
     
     async def get_access_lists(self) -> List[Dict[str, Any]]:
         """Get all access lists"""
-        result = await self._request("GET", "/api/nginx/access-lists")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/nginx/access-lists", cached=True)
     
     async def get_dead_hosts(self) -> List[Dict[str, Any]]:
         """Get all 404 hosts"""
-        result = await self._request("GET", "/api/nginx/dead-hosts")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/nginx/dead-hosts", cached=True)
     
     async def get_users(self) -> List[Dict[str, Any]]:
         """Get all NPM users"""
-        result = await self._request("GET", "/api/users")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/users", cached=True)
     
     async def get_audit_log(self) -> List[Dict[str, Any]]:
         """Get NPM audit log"""
-        result = await self._request("GET", "/api/audit-log")
-        
-        if isinstance(result, dict) and "error" in result:
-            return [result]
-        
-        if isinstance(result, list):
-            return result
-        return []
+        return await self._get_list("/api/audit-log", cached=True)
     
     async def get_all_ports(self) -> List[Dict[str, Any]]:
         """Get all ports being used by NPM (proxy hosts and streams)"""
         ports = []
         
+        # Both lists are fetched concurrently and read raw, without the
+        # per-item projection done by get_proxy_hosts/get_streams
+        hosts, streams = await asyncio.gather(
+            self._get_list("/api/nginx/proxy-hosts"),
+            self._get_list("/api/nginx/streams")
+        )
+        
         # Proxy hosts (typically 80/443)
-        hosts = await self.get_proxy_hosts()
         for host in hosts:
-            if "error" not in host:
-                for domain in host.get("domain_names", []):
-                    ports.append({
-                        "type": "proxy",
-                        "domain": domain,
-                        "forward_host": host.get("forward_host"),
-                        "forward_port": host.get("forward_port"),
-                        "ssl": host.get("ssl_enabled", False)
-                    })
+            if isinstance(host, dict) and "error" not in host:
+                get = host.get
+                forward_host = get("forward_host")
+                forward_port = get("forward_port")
+                ssl_enabled = get("ssl_forced", False) or bool(get("certificate_id"))
+                ports.extend(
+                    dict(zip(_PROXY_PORT_KEYS, ("proxy", domain, forward_host, forward_port, ssl_enabled)))
+                    for domain in get("domain_names", [])
+                )
         
         # Stream proxies (custom ports)
-        streams = await self.get_streams()
         for stream in streams:
-            if "error" not in stream:
-                ports.append({
-                    "type": "stream",
-                    "incoming_port": stream.get("incoming_port"),
-                    "forward_host": stream.get("forwarding_host"),
-                    "forward_port": stream.get("forwarding_port"),
-                    "tcp": stream.get("tcp_forwarding", True),
-                    "udp": stream.get("udp_forwarding", False)
-                })
+            if isinstance(stream, dict) and "error" not in stream:
+                get = stream.get
+                ports.append(dict(zip(_STREAM_PORT_KEYS, (
+                    "stream",
+                    get("incoming_port"),
+                    get("forwarding_host"),
+                    get("forwarding_port"),
+                    get("tcp_forwarding", True),
+                    get("udp_forwarding", False)
+                ))))
         
         return ports
     
     async def close(self):
-        """Close the HTTP client"""
-        if self._client:
-            await self._client.aclose()
+        """No-op: the HTTP client is shared and closed on application shutdown"""
+        pass
@@ -3,16 +3,310 @@ Port Scanner Connector
 """
 
 import asyncio
+import os
+import random
+import re
+import resource
+import select
 import socket
+import struct
 import subprocess
 import shutil
+import time
+import xml.etree.ElementTree as ET
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+
+import httpx
+import orjson
+import psutil
 
 from app.connectors.base import BaseConnector, ConnectorInfo, ConnectorStatus
 
 
+# ss process column: users:(("nginx",pid=1234,fd=5))
+_SS_PROC_RE = re.compile(r'\(\("([^"]+)",pid=(\d+)')
+# nmap port line: 22/tcp   open  ssh     OpenSSH 8.2
+_NMAP_PORT_RE = re.compile(r'(\d+)/(\w+)\s+(\w+)\s+(\S+)\s*(.*)')
+_NMAP_HOST_RE = re.compile(r'for (\S+)')
+
+# Kernel socket tables: (path, protocol, family, state of listening sockets)
+# TCP listens in LISTEN (0A); unconnected UDP sockets sit in CLOSE (07)
+_PROC_NET_TABLES = (
+    ("/proc/net/tcp", "tcp", socket.AF_INET, "0A"),
+    ("/proc/net/tcp6", "tcp", socket.AF_INET6, "0A"),
+    ("/proc/net/udp", "udp", socket.AF_INET, "07"),
+    ("/proc/net/udp6", "udp", socket.AF_INET6, "07"),
+)
+
+
+def _proc_net_addr(hex_addr: str, family: int) -> str:
+    """Decode a /proc/net address, printed as native-endian 32-bit words"""
+    if family == socket.AF_INET:
+        packed = struct.pack("=I", int(hex_addr, 16))
+    else:
+        packed = struct.pack("=4I", *(int(hex_addr[i:i + 8], 16) for i in range(0, 32, 8)))
+    return socket.inet_ntop(family, packed)
+
+
+def _read_proc_net() -> List[tuple]:
+    """Read listening sockets as (protocol, ip, port, inode) from /proc/net"""
+    sockets = []
+    for path, protocol, family, listen_state in _PROC_NET_TABLES:
+        try:
+            with open(path) as f:
+                next(f, None)  # Skip header
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 10 or parts[3] != listen_state:
+                        continue
+                    hex_ip, _, hex_port = parts[1].partition(":")
+                    sockets.append((
+                        protocol,
+                        _proc_net_addr(hex_ip, family),
+                        int(hex_port, 16),
+                        parts[9]
+                    ))
+        except OSError:
+            continue
+    return sockets
+
+
+def _socket_owners(inodes: set) -> Dict[str, tuple]:
+    """Map socket inodes to (process name, pid) by scanning /proc/*/fd
+    
+    Processes whose fds are not readable (other users, without root) are
+    skipped, as `ss -p` would.
+    """
+    owners: Dict[str, tuple] = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        
+        name = None
+        for fd in fds:
+            try:
+                target = os.readlink(f"{fd_dir}/{fd}")
+            except OSError:
+                continue
+            # Socket fds link to "socket:[<inode>]"
+            if not target.startswith("socket:["):
+                continue
+            inode = target[8:-1]
+            if inode in inodes and inode not in owners:
+                if name is None:
+                    try:
+                        with open(f"/proc/{pid}/comm") as f:
+                            name = f.read().strip()
+                    except OSError:
+                        name = ""
+                owners[inode] = (name or None, int(pid))
+        
+        if len(owners) == len(inodes):
+            break
+    return owners
+
+
+# Lifetime in seconds of the cached IP -> interface lookups
+_IFACE_CACHE_TTL = 5.0
+
+
+def _iface_bucket() -> int:
+    """Current cache generation: changes every _IFACE_CACHE_TTL seconds"""
+    return int(time.monotonic() / _IFACE_CACHE_TTL)
+
+
+@lru_cache(maxsize=1)
+def _iface_map(bucket: int) -> Dict[str, str]:
+    """Map every local IP to its interface (rebuilt for each new bucket)"""
+    iface_map = {}
+    for iface, addrs in psutil.net_if_addrs().items():
+        for addr in addrs:
+            if addr.family in (socket.AF_INET, socket.AF_INET6):
+                # Link-local IPv6 addresses carry a "%<iface>" scope suffix
+                iface_map[addr.address.partition("%")[0]] = iface
+    return iface_map
+
+
+@lru_cache(maxsize=1024)
+def _iface_for_ip(ip: str, bucket: int) -> str:
+    """Get the network interface that an IP belongs to
+    
+    Cached per bucket and shared by all connector instances; entries from
+    past buckets are simply never hit again and age out of the LRU.
+    """
+    if ip in ("0.0.0.0", "::", "*", ""):
+        return "all"  # Listening on all interfaces
+    return _iface_map(bucket).get(ip, "unknown")
+
+
+# HTTP client shared by all lookups, created on first use
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=5.0, http2=True)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Port scan states, stored as one byte per port while scanning
+_CLOSED, _OPEN, _FILTERED, _ERROR = range(4)
+_STATE_NAMES = ("closed", "open", "filtered", "error")
+
+# nmap port states; anything else (open|filtered, unfiltered, ...) is filtered
+_NMAP_STATES = {"open": _OPEN, "closed": _CLOSED}
+
+
+def _port_ranges(ports: List[int]) -> str:
+    """Compress ports into an nmap -p spec ("1-1024,3306") that fits in one argument"""
+    ranges = []
+    ordered = sorted(set(ports))
+    start = prev = ordered[0]
+    for port in ordered[1:]:
+        if port != prev + 1:
+            ranges.append(f"{start}-{prev}" if prev != start else str(start))
+            start = port
+        prev = port
+    ranges.append(f"{start}-{prev}" if prev != start else str(start))
+    return ",".join(ranges)
+
+
+def _parse_nmap_xml(xml: bytes) -> bytearray:
+    """Port states by port number from nmap -oX output
+    
+    Ports nmap did not report stay _ERROR. Raises ValueError when the
+    output has no <host> (host down or scan error) or folds several
+    states without saying which ports each covers.
+    """
+    root = ET.fromstring(xml)
+    host = root.find("host")
+    if host is None:
+        raise ValueError("nmap reported no host")
+    
+    states = bytearray([_ERROR]) * 65536
+    
+    # Ports nmap folds into <extraports>, one element per folded state;
+    # <extrareasons ports="..."> says which ports each one covers
+    unlisted = []
+    for extra in host.iterfind(".//extraports"):
+        state = _NMAP_STATES.get(extra.get("state"), _FILTERED)
+        specs = [r.get("ports") for r in extra.iterfind("extrareasons") if r.get("ports")]
+        if not specs:
+            unlisted.append(state)
+        for spec in specs:
+            for part in spec.split(","):
+                first, _, last = part.partition("-")
+                for number in range(int(first), int(last or first) + 1):
+                    states[number] = state
+    
+    if len(unlisted) > 1:
+        raise ValueError("nmap folded several states without port lists")
+    if unlisted:
+        # The only folded state without a port list covers everything else
+        states = states.replace(bytes([_ERROR]), bytes([unlisted[0]]))
+    
+    for port in host.iterfind(".//port"):
+        state = port.find("state")
+        if state is not None:
+            states[int(port.get("portid"))] = _NMAP_STATES.get(state.get("state"), _FILTERED)
+    return states
+
+
+# TCP header without options: ports, seq, ack, data offset, flags, window,
+# checksum, urgent pointer
+_TCP_HEADER = struct.Struct("!HHIIBBHHH")
+_TCP_SYN = 0x02
+_TCP_RST = 0x04
+_TCP_ACK = 0x10
+
+
+def _tcp_checksum(src: bytes, dst: bytes, segment: bytes) -> int:
+    """Internet checksum of a TCP segment over the IPv4 pseudo-header"""
+    data = src + dst + struct.pack("!BBH", 0, socket.IPPROTO_TCP, len(segment)) + segment
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def _syn_scan_sync(src_ip: str, dst_ip: str, ports: List[int], timeout: float) -> bytearray:
+    """Half-open scan of IPv4 ports over a raw socket (needs CAP_NET_RAW)
+    
+    One SYN is sent per port; a SYN-ACK means open, a RST closed, and no
+    answer within timeout after the last SYN filtered. The kernel resets the
+    half-open connections itself since no socket owns the source port.
+    Returns the state code of every port number (one byte per port).
+    """
+    src = socket.inet_aton(src_ip)
+    dst = socket.inet_aton(dst_ip)
+    src_port = random.randint(40000, 60000)
+    seq = random.getrandbits(32)
+    states = bytearray([_FILTERED]) * 65536
+    pending = set(ports)
+    
+    def receive(wait: float) -> None:
+        # The raw socket sees every inbound TCP segment: keep replies from the
+        # target to our source port for the scanned ports
+        if not select.select([sock], [], [], wait)[0]:
+            return
+        packet = sock.recv(65535)
+        ihl = (packet[0] & 0x0F) * 4
+        if packet[12:16] != dst or len(packet) < ihl + 14:
+            return
+        sport, dport = struct.unpack_from("!HH", packet, ihl)
+        if dport != src_port or sport not in pending:
+            return
+        flags = packet[ihl + 13]
+        if flags & (_TCP_SYN | _TCP_ACK) == _TCP_SYN | _TCP_ACK:
+            states[sport] = _OPEN
+        elif flags & _TCP_RST:
+            states[sport] = _CLOSED
+        else:
+            return
+        pending.discard(sport)
+    
+    with socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_TCP) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        
+        for i, port in enumerate(ports, 1):
+            header = _TCP_HEADER.pack(src_port, port, seq, 0, 5 << 4, _TCP_SYN, 1024, 0, 0)
+            checksum = _tcp_checksum(src, dst, header)
+            sock.sendto(header[:16] + struct.pack("!H", checksum) + header[18:], (dst_ip, 0))
+            
+            # Drain replies as we go so the receive buffer never overflows
+            if i % 64 == 0:
+                while pending and select.select([sock], [], [], 0)[0]:
+                    receive(0)
+        
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            receive(remaining)
+    
+    return states
+
+
 @dataclass
 class PortScanResult:
     """Result of a port scan"""
@@ -35,14 +329,36 @@ class PortScannerConnector(BaseConnector):
         1723, 3306, 3389, 5432, 5900, 8080, 8443, 8888
     ]
     
+    # Above this many ports, unprivileged scans are delegated to nmap
+    NMAP_SCAN_THRESHOLD = 1000
+    
+    # Maximum number of ports probed at once, across all scans (further
+    # capped to half the process's file descriptor limit)
+    SCAN_CONCURRENCY = 500
+    
+    # Lifetime in seconds of the cached public IP
+    PUBLIC_IP_TTL = 300.0
+    
     def __init__(self):
         self.nmap_path = shutil.which("nmap")
         self.ss_path = shutil.which("ss")
         self.netstat_path = shutil.which("netstat")
+        self._scan_sem = asyncio.BoundedSemaphore(self._scan_concurrency())
+        self._public_ip: tuple[float, Optional[str]] = (float("-inf"), None)
+    
+    @classmethod
+    def _scan_concurrency(cls) -> int:
+        """Concurrent probes allowed without risking EMFILE"""
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit == resource.RLIM_INFINITY:
+            return cls.SCAN_CONCURRENCY
+        return max(1, min(cls.SCAN_CONCURRENCY, soft_limit // 2))
     
     async def check_availability(self) -> ConnectorInfo:
         """Check if port scanning is available"""
         tools = []
+        if os.path.exists("/proc/net/tcp"):
+            tools.append("procfs")
         if self.nmap_path:
             tools.append("nmap")
         if self.ss_path:
@@ -75,43 +391,43 @@ class PortScannerConnector(BaseConnector):
     
     async def get_listening_ports(self) -> List[Dict[str, Any]]:
         """Get all listening ports on the local system with process and interface info"""
+        if os.path.exists("/proc/net/tcp"):
+            return await self._get_ports_proc()
         if self.ss_path:
             return await self._get_ports_ss()
         elif self.netstat_path:
             return await self._get_ports_netstat()
         return []
     
-    async def _get_interface_for_ip(self, ip: str) -> Optional[str]:
-        """Get the network interface that an IP belongs to"""
-        if ip in ("0.0.0.0", "::", "*", ""):
-            return "all"  # Listening on all interfaces
+    async def _get_ports_proc(self) -> List[Dict[str, Any]]:
+        """Get listening ports from the kernel's /proc/net socket tables
         
-        try:
-            ip_path = shutil.which("ip")
-            if ip_path:
-                process = await asyncio.create_subprocess_exec(
-                    ip_path, "addr", "show",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, _ = await process.communicate()
-                output = stdout.decode()
-                
-                # Parse ip addr output to find interface for IP
-                current_iface = None
-                for line in output.split('\n'):
-                    # Interface line: "2: eth0: <BROADCAST,..."
-                    if ': ' in line and not line.startswith(' '):
-                        parts = line.split(': ')
-                        if len(parts) >= 2:
-                            current_iface = parts[1].split('@')[0]
-                    # IP line: "    inet 192.168.1.10/24..."
-                    elif 'inet ' in line or 'inet6 ' in line:
-                        if ip in line:
-                            return current_iface
-        except Exception:
-            pass
-        return None
+        Same output as _get_ports_ss without spawning sudo/ss: the tables are
+        read in-process and owners are resolved through /proc/*/fd.
+        """
+        sockets = await asyncio.to_thread(_read_proc_net)
+        owners = await asyncio.to_thread(_socket_owners, {inode for *_, inode in sockets})
+        
+        ports = []
+        iface_bucket = _iface_bucket()
+        
+        for protocol, ip, port, inode in sockets:
+            process_name, pid = owners.get(inode, (None, None))
+            
+            ports.append({
+                "ip": ip,
+                "address": ip,  # Alias for frontend
+                "port": port,
+                "protocol": protocol,
+                "state": "LISTEN",
+                "process": process_name,
+                "program": process_name,  # Alias for frontend
+                "pid": pid,
+                "interface": _iface_for_ip(ip, iface_bucket),
+                "is_public": ip in ("0.0.0.0", "::", "")
+            })
+        
+        return ports
     
     async def _get_ports_ss(self) -> List[Dict[str, Any]]:
         """Get listening ports using ss command with process info"""
@@ -122,39 +438,33 @@ class PortScannerConnector(BaseConnector):
         process = await asyncio.create_subprocess_exec(
             "sudo", self.ss_path, "-tulnp",
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.DEVNULL
         )
-        stdout, stderr = await process.communicate()
         
         ports = []
-        lines = stdout.decode().strip().split('\n')
         
         # Get interface mapping
-        interface_cache: Dict[str, str] = {}
+        iface_bucket = _iface_bucket()
         
-        for line in lines[1:]:  # Skip header
-            parts = line.split()
+        # Parse lines as ss writes them instead of buffering the whole output
+        await process.stdout.readline()  # Skip header
+        async for line in process.stdout:
+            parts = line.decode().split()
             if len(parts) >= 5:
-                state = parts[0]
                 local_addr = parts[4]
                 
-                # Parse address and port
-                ip = ""
-                port = ""
-                if local_addr.startswith('['):
+                # Parse address and port: "1.2.3.4:80", "*:80", "[::1]:80",
+                # "[fe80::1]%eth0:546"
+                idx = local_addr.rfind(':')
+                if idx < 0:
+                    continue
+                port = local_addr[idx + 1:]
+                if local_addr[0] == '[':
                     # IPv6
-                    match = local_addr.rsplit(']:', 1)
-                    if len(match) == 2:
-                        ip = match[0][1:]  # Remove leading [
-                        port = match[1]
+                    ip = local_addr[1:local_addr.rfind(']', 0, idx)]
                 else:
                     # IPv4
-                    match = local_addr.rsplit(':', 1)
-                    if len(match) == 2:
-                        ip = match[0]
-                        port = match[1]
-                    else:
-                        continue
+                    ip = local_addr[:idx]
                 
                 protocol = "tcp" if "tcp" in parts[0].lower() else "udp"
                 
@@ -163,31 +473,27 @@ class PortScannerConnector(BaseConnector):
                 pid = None
                 if len(parts) >= 7:
                     proc_info = parts[6] if len(parts) > 6 else ""
-                    # Parse process info
-                    import re
-                    proc_match = re.search(r'\(\("([^"]+)",pid=(\d+)', proc_info)
+                    proc_match = _SS_PROC_RE.search(proc_info)
                     if proc_match:
                         process_name = proc_match.group(1)
                         pid = int(proc_match.group(2))
                 
-                # Get interface for IP
                 clean_ip = ip if ip != "*" else "0.0.0.0"
-                if clean_ip not in interface_cache:
-                    interface_cache[clean_ip] = await self._get_interface_for_ip(clean_ip) or "unknown"
                 
                 ports.append({
                     "ip": clean_ip,
                     "address": clean_ip,  # Alias for frontend
-                    "port": int(port) if port != "*" and port.isdigit() else 0,
+                    "port": int(port) if port.isdigit() else 0,
                     "protocol": protocol,
                     "state": "LISTEN",
                     "process": process_name,
                     "program": process_name,  # Alias for frontend
                     "pid": pid,
-                    "interface": interface_cache[clean_ip],
+                    "interface": _iface_for_ip(clean_ip, iface_bucket),
                     "is_public": clean_ip in ("0.0.0.0", "::", "")
                 })
         
+        await process.wait()
         return ports
     
     async def _get_ports_netstat(self) -> List[Dict[str, Any]]:
@@ -197,99 +503,166 @@ class PortScannerConnector(BaseConnector):
         process = await asyncio.create_subprocess_exec(
             self.netstat_path, "-tuln",
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.DEVNULL
         )
-        stdout, stderr = await process.communicate()
         
         ports = []
-        lines = stdout.decode().strip().split('\n')
         
-        for line in lines[2:]:  # Skip headers
-            parts = line.split()
-            if len(parts) >= 4:
-                protocol = parts[0].lower()
-                local_addr = parts[3]
+        # Skip headers
+        await process.stdout.readline()
+        await process.stdout.readline()
+        async for raw in process.stdout:
+            line = raw.decode()
+            
+            # Fixed layout: Proto in columns 0-5, Local Address from column 20.
+            # The address is cut at the next space rather than at a fixed end
+            # since netstat widens that column for long IPv6 addresses.
+            protocol = line[:6].rstrip().lower()
+            local_addr = line[20:].partition(' ')[0]
+            
+            # Parse address and port
+            idx = local_addr.rfind(':')
+            if idx >= 0:
+                ip = local_addr[:idx]
+                port = local_addr[idx + 1:]
                 
-                # Parse address and port
-                if ':' in local_addr:
-                    addr_parts = local_addr.rsplit(':', 1)
-                    ip = addr_parts[0]
-                    port = addr_parts[1]
-                    
-                    ports.append({
-                        "ip": ip if ip != "0.0.0.0" and ip != "::" else "0.0.0.0",
-                        "port": int(port) if port.isdigit() else 0,
-                        "protocol": protocol.replace('6', ''),
-                        "state": parts[-1] if len(parts) >= 6 else "LISTEN"
-                    })
+                ports.append({
+                    "ip": ip if ip != "0.0.0.0" and ip != "::" else "0.0.0.0",
+                    "port": int(port) if port.isdigit() else 0,
+                    "protocol": protocol.replace('6', ''),
+                    # Only TCP rows have a State column
+                    "state": line.rstrip().rpartition(' ')[2] if protocol.startswith("tcp") else "LISTEN"
+                })
         
+        await process.wait()
         return ports
     
+    async def _probe(self, host: str, port: int, timeout: float) -> tuple[int, Optional[str]]:
+        """Connect-scan a single port, returning (state code, error)"""
+        async with self._scan_sem:
+            try:
+                # TCP connect scan
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), timeout=timeout
+                )
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+                return _OPEN, None
+            except asyncio.TimeoutError:
+                return _FILTERED, None
+            except socket.gaierror as e:
+                return _ERROR, str(e)
+            except OSError:
+                # Refused, unreachable, ...
+                return _CLOSED, None
+            except Exception as e:
+                return _ERROR, str(e)
+    
     async def scan_port(self, host: str, port: int, timeout: float = 1.0) -> Dict[str, Any]:
         """Scan a single port on a host"""
-        loop = asyncio.get_event_loop()
+        state, error = await self._probe(host, port, timeout)
         
-        try:
-            # TCP connect scan
-            future = loop.run_in_executor(
-                None,
-                self._tcp_connect,
-                host, port, timeout
-            )
-            is_open = await asyncio.wait_for(future, timeout=timeout + 0.5)
+        result = {
+            "host": host,
+            "port": port,
+            "protocol": "tcp",
+            "state": _STATE_NAMES[state],
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if error is not None:
+            result["error"] = error
+        return result
+    
+    async def scan_ports(self, host: str, ports: Optional[List[int]] = None, 
+                         timeout: float = 1.0) -> List[Dict[str, Any]]:
+        """Scan multiple ports on a host
+        
+        All ports are scanned at once; concurrency is bounded by the
+        connector-wide semaphore in _probe. States are kept one byte per
+        port and result dicts are only built once the scan is done.
+        """
+        if ports is None:
+            ports = self.COMMON_PORTS
+        
+        errors: Dict[int, str] = {}
+        port_states = None
+        if ports and min(ports) >= 0 and max(ports) <= 65535:
+            if os.geteuid() == 0:
+                port_states = await self._syn_scan(host, ports, timeout)
+            elif len(ports) > self.NMAP_SCAN_THRESHOLD and self.nmap_path:
+                port_states = await self._nmap_scan(host, ports, timeout)
+        
+        if port_states is not None:
+            states = bytearray(map(port_states.__getitem__, ports))
+        else:
+            states = bytearray(len(ports))
             
-            return {
-                "host": host,
-                "port": port,
-                "protocol": "tcp",
-                "state": "open" if is_open else "closed",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except asyncio.TimeoutError:
-            return {
-                "host": host,
-                "port": port,
-                "protocol": "tcp",
-                "state": "filtered",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            return {
+            async def probe(i: int, port: int):
+                states[i], error = await self._probe(host, port, timeout)
+                if error is not None:
+                    errors[i] = error
+            
+            await asyncio.gather(*(probe(i, port) for i, port in enumerate(ports)))
+        
+        timestamp = datetime.utcnow().isoformat()
+        results = [
+            {
                 "host": host,
                 "port": port,
                 "protocol": "tcp",
-                "state": "error",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
+                "state": _STATE_NAMES[state],
+                "timestamp": timestamp
             }
+            for port, state in zip(ports, states)
+        ]
+        for i, error in errors.items():
+            results[i]["error"] = error
+        return results
     
-    def _tcp_connect(self, host: str, port: int, timeout: float) -> bool:
-        """Attempt TCP connection to a port"""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
+    async def _syn_scan(self, host: str, ports: List[int], timeout: float) -> Optional[bytearray]:
+        """SYN-scan an IPv4 host, None if a raw socket scan is not possible"""
+        loop = asyncio.get_running_loop()
         try:
-            result = sock.connect_ex((host, port))
-            return result == 0
-        finally:
-            sock.close()
+            infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+            dst_ip = infos[0][4][0]
+            
+            # Source address the kernel would route from (no packet is sent)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+                probe.connect((dst_ip, 9))
+                src_ip = probe.getsockname()[0]
+            
+            return await asyncio.to_thread(_syn_scan_sync, src_ip, dst_ip, ports, timeout)
+        except (OSError, IndexError):
+            return None
     
-    async def scan_ports(self, host: str, ports: Optional[List[int]] = None, 
-                         timeout: float = 1.0) -> List[Dict[str, Any]]:
-        """Scan multiple ports on a host"""
-        if ports is None:
-            ports = self.COMMON_PORTS
+    async def _nmap_scan(self, host: str, ports: List[int], timeout: float) -> Optional[bytearray]:
+        """Connect-scan through nmap, None if it fails
         
-        # Scan ports concurrently in batches
-        batch_size = 50
-        results = []
-        
-        for i in range(0, len(ports), batch_size):
-            batch = ports[i:i + batch_size]
-            tasks = [self.scan_port(host, port, timeout) for port in batch]
-            batch_results = await asyncio.gather(*tasks)
-            results.extend(batch_results)
+        Used for dense unprivileged scans: nmap's native scan loop is far
+        cheaper per port than one coroutine per port.
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.nmap_path, "-sT", "-T4", "--min-rate", "5000", "-Pn", "-n",
+                "--max-rtt-timeout", f"{max(int(timeout * 1000), 100)}ms",
+                "-p", _port_ranges(ports), "-oX", "-", host,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate()
+            if process.returncode != 0:
+                return None
+            states = _parse_nmap_xml(stdout)
+        except (OSError, ET.ParseError, ValueError):
+            return None
         
-        return results
+        # Any port nmap did not account for: let the caller probe instead
+        if any(states[port] == _ERROR for port in ports):
+            return None
+        return states
     
     async def scan_with_nmap(self, target: str, ports: str = "1-1000", 
                               options: Optional[List[str]] = None) -> Dict[str, Any]:
@@ -322,8 +695,6 @@ class PortScannerConnector(BaseConnector):
     
     def _parse_nmap_output(self, output: str) -> Dict[str, Any]:
         """Parse nmap output"""
-        import re
-        
         result = {
             "host": None,
             "state": None,
@@ -331,12 +702,10 @@ class PortScannerConnector(BaseConnector):
             "raw": output
         }
         
-        lines = output.split('\n')
-        
-        for line in lines:
+        for line in output.splitlines():
             # Host status
             if "Nmap scan report for" in line:
-                match = re.search(r'for (\S+)', line)
+                match = _NMAP_HOST_RE.search(line)
                 if match:
                     result["host"] = match.group(1)
             
@@ -345,7 +714,10 @@ class PortScannerConnector(BaseConnector):
                 result["state"] = "up"
             
             # Port info: 22/tcp   open  ssh     OpenSSH 8.2
-            port_match = re.match(r'(\d+)/(\w+)\s+(\w+)\s+(\S+)\s*(.*)', line)
+            # (cheap substring test first, the regex only runs on port lines)
+            if "/tcp" not in line and "/udp" not in line and "/sctp" not in line:
+                continue
+            port_match = _NMAP_PORT_RE.match(line)
             if port_match:
                 result["ports"].append({
                     "port": int(port_match.group(1)),
@@ -358,31 +730,21 @@ class PortScannerConnector(BaseConnector):
         return result
     
     async def get_public_ip(self) -> Optional[str]:
-        """Get the public IP address of this system"""
-        try:
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                async with session.get('https://api.ipify.org?format=json', timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data.get('ip')
-        except Exception:
-            pass
+        """Get the public IP address of this system (cached for PUBLIC_IP_TTL seconds)"""
+        fetched_at, public_ip = self._public_ip
+        if public_ip and time.monotonic() - fetched_at < self.PUBLIC_IP_TTL:
+            return public_ip
         
-        # Fallback: try to get from socket
         try:
-            process = await asyncio.create_subprocess_shell(
-                "curl -s https://api.ipify.org",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await process.communicate()
-            if stdout:
-                return stdout.decode().strip()
+            response = await _get_http_client().get('https://api.ipify.org?format=json')
+            if response.status_code == 200:
+                public_ip = orjson.loads(response.content).get('ip')
         except Exception:
-            pass
+            return None
         
-        return None
+        if public_ip:
+            self._public_ip = (time.monotonic(), public_ip)
+        return public_ip
     
     async def scan_public_ports(self, ports: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """Scan open ports on the public IP"""
@@ -5,13 +5,47 @@ UFW (Uncomplicated Firewall) Connector
 import asyncio
 import re
 import shutil
+from itertools import islice
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
 from app.connectors.base import BaseFirewallConnector, ConnectorInfo, ConnectorStatus
 
 
-@dataclass
+_VERSION_RE = re.compile(r'ufw (\d+\.\d+(?:\.\d+)?)')
+# Rule line: [ 1] 22/tcp                     ALLOW IN    Anywhere
+_RULE_RE = re.compile(r'\[\s*(\d+)\]\s+(.+?)\s+(ALLOW|DENY|REJECT|LIMIT)\s+(IN|OUT|FWD)?\s*(.*)')
+_PORT_RE = re.compile(r'(\d+)(?:/(\w+))?')
+
+
+def _parse_status(rest: str, status_info: Dict[str, Any]):
+    # "Status: active" / "Status: inactive"
+    status_info["enabled"] = rest.strip() == "active"
+
+
+def _parse_default(rest: str, status_info: Dict[str, Any]):
+    # "Default: deny (incoming), allow (outgoing), disabled (routed)"
+    for item in rest.split(","):
+        policy, _, direction = item.strip().partition(" ")
+        direction = direction.strip("()")
+        if direction in ("incoming", "outgoing", "routed"):
+            status_info[f"default_{direction}"] = policy.lower()
+
+
+def _parse_logging(rest: str, status_info: Dict[str, Any]):
+    # "Logging: on (low)"
+    status_info["logging"] = rest.strip().lower()
+
+
+# `ufw status verbose` line prefix -> parser updating the status dict
+_STATUS_HANDLERS = {
+    "Status:": _parse_status,
+    "Default:": _parse_default,
+    "Logging:": _parse_logging,
+}
+
+
+@dataclass(slots=True)
 class UFWRule:
     """Represents a UFW rule"""
     id: str
@@ -59,7 +93,7 @@ class UFWConnector(BaseFirewallConnector):
         try:
             returncode, stdout, stderr = await self._run_command("version")
             if returncode == 0:
-                version_match = re.search(r'ufw (\d+\.\d+(?:\.\d+)?)', stdout)
+                version_match = _VERSION_RE.search(stdout)
                 version = version_match.group(1) if version_match else "unknown"
                 return ConnectorInfo(
                     name=self.name,
@@ -89,7 +123,6 @@ class UFWConnector(BaseFirewallConnector):
         if returncode != 0:
             return {"error": stderr, "enabled": False}
         
-        lines = stdout.strip().split('\n')
         status_info = {
             "enabled": False,
             "default_incoming": "deny",
@@ -98,18 +131,11 @@ class UFWConnector(BaseFirewallConnector):
             "logging": "off"
         }
         
-        for line in lines:
-            if line.startswith("Status:"):
-                status_info["enabled"] = "active" in line.lower()
-            elif line.startswith("Default:"):
-                parts = line.split()
-                for i, part in enumerate(parts):
-                    if "incoming" in part.lower():
-                        status_info["default_incoming"] = parts[i-1].lower() if i > 0 else "deny"
-                    elif "outgoing" in part.lower():
-                        status_info["default_outgoing"] = parts[i-1].lower() if i > 0 else "allow"
-            elif line.startswith("Logging:"):
-                status_info["logging"] = line.split(":")[1].strip().lower()
+        for line in stdout.splitlines():
+            prefix, _, rest = line.partition(" ")
+            handler = _STATUS_HANDLERS.get(prefix)
+            if handler:
+                handler(rest, status_info)
         
         return status_info
     
@@ -121,23 +147,13 @@ class UFWConnector(BaseFirewallConnector):
             return []
         
         rules = []
-        lines = stdout.strip().split('\n')
+        lines = stdout.splitlines()
         
-        # Skip header lines
-        in_rules = False
-        for line in lines:
-            if line.startswith("--"):
-                in_rules = True
-                continue
-            
-            if not in_rules or not line.strip():
-                continue
-            
-            # Parse rule line: [ 1] 22/tcp                     ALLOW IN    Anywhere
-            rule_match = re.match(
-                r'\[\s*(\d+)\]\s+(.+?)\s+(ALLOW|DENY|REJECT|LIMIT)\s+(IN|OUT|FWD)?\s*(.*)',
-                line
-            )
+        # Skip header lines: rules follow the (indented) "--" separator
+        start = next((i for i, line in enumerate(lines) if line.lstrip().startswith("--")), len(lines)) + 1
+        
+        for line in islice(lines, start, None):
+            rule_match = _RULE_RE.match(line)
             
             if rule_match:
                 rule_id = rule_match.group(1)
@@ -151,7 +167,7 @@ class UFWConnector(BaseFirewallConnector):
                 protocol = None
                 app = None
                 
-                port_match = re.match(r'(\d+)(?:/(\w+))?', to_spec)
+                port_match = _PORT_RE.match(to_spec)
                 if port_match:
                     port = port_match.group(1)
                     protocol = port_match.group(2) or "any"
@@ -172,8 +188,9 @@ class UFWConnector(BaseFirewallConnector):
         
         return rules
     
-    async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
-        """Add a new UFW rule
+    @staticmethod
+    def _build_rule_args(rule: Dict[str, Any]) -> List[str]:
+        """Build the ufw arguments adding a rule
         
         Args:
             rule: Dictionary with keys:
@@ -234,14 +251,40 @@ class UFWConnector(BaseFirewallConnector):
         if comment:
             args.extend(["comment", comment])
         
-        # Execute
-        returncode, stdout, stderr = await self._run_command(*args)
+        return args
+    
+    async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a new UFW rule (see _build_rule_args for the rule format)"""
+        returncode, stdout, stderr = await self._run_command(*self._build_rule_args(rule))
         
         if returncode == 0:
             return {"success": True, "message": stdout.strip()}
         else:
             return {"success": False, "error": stderr.strip() or stdout.strip()}
     
+    async def bulk_add_rules(self, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Add several rules (same format as add_rule)
+        
+        UFW has no transactions: rules are applied in order and a failing
+        rule does not undo the ones before it.
+        """
+        if not rules:
+            return {"success": True, "message": "No rules to add"}
+        
+        errors = []
+        for rule in rules:
+            returncode, stdout, stderr = await self._run_command(*self._build_rule_args(rule))
+            if returncode != 0:
+                errors.append((stderr or stdout).strip())
+        
+        if not errors:
+            return {"success": True, "message": f"{len(rules)} rules added successfully"}
+        return {
+            "success": False,
+            "error": f"{len(errors)} of {len(rules)} rules failed",
+            "errors": errors
+        }
+    
     async def delete_rule(self, rule_id: str) -> bool:
         """Delete a UFW rule by its number"""
         # UFW requires confirmation, use --force to skip
@@ -250,6 +293,30 @@ class UFWConnector(BaseFirewallConnector):
         )
         return returncode == 0
     
+    async def bulk_delete_rules(self, rule_ids: List[str]) -> Dict[str, Any]:
+        """Delete several UFW rules by number"""
+        if not rule_ids:
+            return {"success": True, "message": "No rules to delete"}
+        
+        # Deleting a rule renumbers the ones after it: go from the highest,
+        # once per number, or a repeated ID would delete the next rule down
+        try:
+            numbers = sorted({int(rule_id) for rule_id in rule_ids}, reverse=True)
+        except ValueError:
+            return {"success": False, "error": "Rule IDs must be rule numbers"}
+        if numbers[-1] <= 0:
+            return {"success": False, "error": "Rule numbers start at 1"}
+        
+        failed = []
+        for number in numbers:
+            returncode, stdout, stderr = await self._run_command("--force", "delete", str(number))
+            if returncode != 0:
+                failed.append(str(number))
+        
+        if not failed:
+            return {"success": True, "message": f"{len(numbers)} rules deleted successfully"}
+        return {"success": False, "error": f"Failed to delete rules: {', '.join(failed)}"}
+    
     async def enable(self) -> bool:
         """Enable UFW"""
         returncode, stdout, stderr = await self._run_command("--force", "enable")
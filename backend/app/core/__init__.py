@@ -4,8 +4,11 @@ from app.core.database import get_db, Base
 from app.core.security import (
     get_password_hash,
     verify_password,
+    aget_password_hash,
+    averify_password,
     create_access_token,
     get_current_user,
     get_current_admin,
+    invalidate_user_cache,
     require_permission
 )
@@ -0,0 +1,120 @@
+"""
+Audit Log Writer - Batches audit entries into bulk inserts
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core.database import async_session_maker
+from app.models.audit import AuditLog
+
+# Flush a batch once it holds this many entries or has waited this long
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.1
+QUEUE_SIZE = 10_000
+
+logger = logging.getLogger(__name__)
+
+_audit_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+
+
+async def _insert(rows: List[Dict[str, Any]]):
+    """Insert audit rows in a single transaction"""
+    async with async_session_maker() as session:
+        await session.execute(insert(AuditLog), rows)
+        await session.commit()
+
+
+async def _write_batch(batch: List[Dict[str, Any]]):
+    """Insert a batch of audit entries, row by row if the bulk insert fails
+    
+    One bad row (or a transient error) must not take the whole batch down
+    with it: only rows that still fail on their own are dropped, each with
+    its own error record.
+    """
+    try:
+        await _insert(batch)
+        return
+    except Exception:
+        logger.exception("Bulk insert of %d audit log entries failed, retrying one by one", len(batch))
+    
+    for row in batch:
+        try:
+            await _insert([row])
+        except Exception:
+            logger.exception("Dropping audit log entry: %r", row)
+
+
+async def _drain_audit(queue: asyncio.Queue):
+    """Collect queued entries into batches until the None sentinel arrives"""
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        entry = await queue.get()
+        if entry is None:
+            return
+        
+        batch = [entry]
+        deadline = loop.time() + FLUSH_INTERVAL
+        stop = False
+        
+        while len(batch) < BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                entry = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if entry is None:
+                stop = True
+                break
+            batch.append(entry)
+        
+        await _write_batch(batch)
+        if stop:
+            return
+
+
+async def record_audit(**fields: Any):
+    """Queue an audit log entry (AuditLog column values) for the background writer"""
+    # Stamp the event time now rather than when the batch is flushed
+    fields.setdefault("created_at", datetime.utcnow())
+    
+    if _audit_queue is None:
+        # Writer not running (e.g. outside the app lifespan): write directly
+        await _write_batch([fields])
+        return
+    
+    await _audit_queue.put(fields)
+
+
+def start_audit_writer():
+    """Start the background audit writer"""
+    global _audit_queue, _writer_task
+    
+    if _writer_task is not None:
+        return
+    
+    _audit_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    _writer_task = asyncio.create_task(_drain_audit(_audit_queue))
+
+
+async def stop_audit_writer():
+    """Flush pending audit entries and stop the background writer"""
+    global _audit_queue, _writer_task
+    
+    if _writer_task is None:
+        return
+    
+    queue, task = _audit_queue, _writer_task
+    _audit_queue = None
+    _writer_task = None
+    
+    await queue.put(None)
+    await task
@@ -4,8 +4,8 @@ Application Configuration
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, computed_field
-from typing import List
-from functools import lru_cache
+from typing import Tuple
+from functools import cached_property, lru_cache
 
 
 class Settings(BaseSettings):
@@ -17,22 +17,26 @@ class Settings(BaseSettings):
     
     # Security
     SECRET_KEY: str = Field(default="change-me-in-production-use-openssl-rand-hex-32")
+    # For EdDSA (Ed25519): SECRET_KEY holds the private PEM and PUBLIC_KEY the
+    # public PEM; PUBLIC_KEY alone is enough to verify tokens
     ALGORITHM: str = "HS256"
+    PUBLIC_KEY: str = ""
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    BCRYPT_ROUNDS: int = 12  # log2 cost; tune to the host CPU (see startup timing)
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./firewall_ui.db"
     
-    # CORS - stored as comma-separated string, accessed as list via property
+    # CORS - stored as comma-separated string, accessed as a tuple parsed once
     CORS_ORIGINS_STR: str = Field(
         default="http://localhost:3000,http://localhost:5173,http://127.0.0.1:5173",
         alias="CORS_ORIGINS"
     )
     
     @computed_field
-    @property
-    def CORS_ORIGINS(self) -> List[str]:
-        return [origin.strip() for origin in self.CORS_ORIGINS_STR.split(',') if origin.strip()]
+    @cached_property
+    def CORS_ORIGINS(self) -> Tuple[str, ...]:
+        return tuple(origin.strip() for origin in self.CORS_ORIGINS_STR.split(',') if origin.strip())
     
     # Admin
     ADMIN_USERNAME: str = "admin"
@@ -43,6 +47,7 @@ class Settings(BaseSettings):
     NPM_URL: str = ""
     NPM_EMAIL: str = ""
     NPM_PASSWORD: str = ""
+    NPM_CA_BUNDLE: str = ""  # CA file for NPM's certificate; empty uses system CAs
     
     # Docker
     DOCKER_SOCKET: str = "/var/run/docker.sock"
@@ -53,6 +58,11 @@ class Settings(BaseSettings):
     # API Port
     API_PORT: int = 8000
     
+    # uvicorn worker processes. Caches (users, NPM responses, nft ruleset)
+    # are per process and invalidated only in the worker that made the
+    # change: more than one worker needs shared cache invalidation first
+    API_WORKERS: int = 1
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
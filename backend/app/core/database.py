@@ -2,25 +2,48 @@
 Database Configuration and Session Management
 """
 
+import logging
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from typing import AsyncGenerator
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     """Base class for all models"""
     pass
 
 
+_is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    future=True
+    future=True,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False, "timeout": 30} if _is_sqlite else {}
 )
 
+
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _):
+        """WAL lets readers proceed while a writer commits"""
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
 # Create session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -36,7 +59,9 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         try:
             yield session
-            await session.commit()
+            # Read-only requests skip the COMMIT round-trip
+            if session.new or session.dirty or session.deleted:
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -45,30 +70,45 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def init_db():
-    """Initialize database tables and create admin user"""
+    """Initialize database tables and create admin user
+    
+    Everything runs in one transaction on one connection. The admin row is
+    inserted with ON CONFLICT DO NOTHING on PostgreSQL and SQLite, so workers
+    starting together cannot race each other into a unique-constraint error.
+    Other backends fall back to a plain insert after the existence check.
+    """
+    from sqlalchemy import func, insert, select
     from app.models.user import User
     from app.models.audit import AuditLog
     from app.core.security import get_password_hash
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    
-    # Create admin user if not exists
-    async with async_session_maker() as session:
-        from sqlalchemy import select
-        result = await session.execute(
-            select(User).where(User.username == settings.ADMIN_USERNAME)
+        
+        # Create admin user if not exists (checked first to skip hashing)
+        admin_count = await conn.scalar(
+            select(func.count()).select_from(User).where(User.username == settings.ADMIN_USERNAME)
         )
-        admin = result.scalar_one_or_none()
+        if admin_count:
+            return
+        
+        values = dict(
+            username=settings.ADMIN_USERNAME,
+            email=settings.ADMIN_EMAIL,
+            hashed_password=get_password_hash(settings.ADMIN_PASSWORD),
+            role="admin",
+            is_active=True
+        )
+        
+        if conn.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as pg_insert
+            stmt = pg_insert(User).values(**values).on_conflict_do_nothing()
+        elif conn.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            stmt = sqlite_insert(User).values(**values).on_conflict_do_nothing()
+        else:
+            stmt = insert(User).values(**values)
         
-        if not admin:
-            admin = User(
-                username=settings.ADMIN_USERNAME,
-                email=settings.ADMIN_EMAIL,
-                hashed_password=get_password_hash(settings.ADMIN_PASSWORD),
-                role="admin",
-                is_active=True
-            )
-            session.add(admin)
-            await session.commit()
-            print(f"Admin user created: {settings.ADMIN_USERNAME}")
+        result = await conn.execute(stmt)
+        if result.rowcount:
+            logger.info("Admin user created: %s", settings.ADMIN_USERNAME)
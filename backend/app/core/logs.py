@@ -0,0 +1,117 @@
+"""
+Logging - JSON log records written by a background thread
+"""
+
+import logging
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional
+
+import orjson
+
+access_logger = logging.getLogger("app.access")
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Render log records as single-line JSON"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        http = getattr(record, "http", None)
+        if http is not None:
+            entry["http"] = http
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+
+def setup_logging(level: int = logging.INFO):
+    """Route all logging through a queue drained by a background thread
+    
+    Call after uvicorn has configured its loggers: their handlers are
+    replaced so they propagate to the queue-backed root logger.
+    """
+    global _listener
+    
+    if _listener is not None:
+        return
+    
+    queue = SimpleQueue()
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter())
+    
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(queue)]
+    root.setLevel(level)
+    
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    
+    _listener = QueueListener(queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background thread
+    
+    The root logger then writes straight to the JSON handler, so records
+    uvicorn logs after the lifespan ends are not left in an undrained queue.
+    """
+    global _listener
+    
+    if _listener is None:
+        return
+    
+    _listener.stop()
+    logging.getLogger().handlers = list(_listener.handlers)
+    _listener = None
+
+
+class AccessLogMiddleware:
+    """ASGI middleware emitting one access log record per HTTP request"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            client = scope.get("client")
+            access_logger.info(
+                "%s %s %d",
+                scope["method"],
+                scope["path"],
+                status_code,
+                extra={"http": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "client": client[0] if client else None,
+                }},
+            )
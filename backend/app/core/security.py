@@ -2,9 +2,19 @@
 Security utilities - Password hashing, JWT tokens, etc.
 """
 
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Any
-from jose import jwt, JWTError
+from functools import lru_cache
+from typing import Optional, Any, Dict, Tuple
+import jwt
+from jwt import PyJWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -12,7 +22,32 @@ from fastapi.security import OAuth2PasswordBearer
 from app.core.config import settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__ident="2b",
+)
+
+# bcrypt is deliberately slow: run it on worker threads, not the event loop
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="bcrypt")
+
+
+def _load_jwt_keys() -> Tuple[Any, Any]:
+    """Get the (signing, verification) keys for settings.ALGORITHM"""
+    if settings.ALGORITHM.startswith("HS"):
+        return settings.SECRET_KEY, settings.SECRET_KEY
+    if settings.PUBLIC_KEY:
+        return settings.SECRET_KEY, settings.PUBLIC_KEY
+    
+    # Asymmetric algorithm without an explicit public key: derive it
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    private_key = load_pem_private_key(settings.SECRET_KEY.encode(), password=None)
+    return private_key, private_key.public_key()
+
+
+# JWT keys
+_signing_key, _verification_key = _load_jwt_keys()
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -28,28 +63,92 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def check_password_hashing() -> float:
+    """Hash and verify a fixed password, returning the elapsed milliseconds"""
+    start = time.perf_counter()
+    if not pwd_context.verify("firewall-ui-self-test", pwd_context.hash("firewall-ui-self-test")):
+        raise RuntimeError("bcrypt self-test failed")
+    return (time.perf_counter() - start) * 1000
+
+
+async def aget_password_hash(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_pool, pwd_context.hash, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_pool, pwd_context.verify, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
+    now = int(time.time())
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        lifetime = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        lifetime = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    to_encode.update({"exp": now + lifetime, "iat": now, "nbf": now})
+    encoded_jwt = jwt.encode(to_encode, _signing_key, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
 
 
+# Decoded token cache: digest -> (deadline, payload), least recently used first
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_TTL = 60.0
+_token_cache: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decode a JWT access token"""
+    """Decode a JWT access token
+    
+    Verified payloads are cached for up to TOKEN_CACHE_TTL seconds, never
+    past the token's own expiry, so repeat requests skip signature checks.
+    """
+    # Reject obvious junk before hashing or touching the crypto path
+    if len(token) < 32 or token.count(".") != 2:
+        return None
+    
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _token_cache.move_to_end(key)
+                return entry[1]
+            del _token_cache[key]
+    
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+        payload = jwt.decode(
+            token,
+            _verification_key,
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["exp", "sub"], "verify_exp": True},
+            leeway=0,
+        )
+    except PyJWTError:
         return None
+    
+    deadline = now + TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        deadline = min(deadline, exp)
+    
+    with _token_cache_lock:
+        _token_cache[key] = (deadline, payload)
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    
+    return payload
 
 
 class TokenData:
@@ -60,11 +159,34 @@ class TokenData:
         self.role = role
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    """Read-only snapshot of an authenticated user, safe to share between requests"""
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+
+# Authenticated user cache: user id -> (deadline, snapshot)
+USER_CACHE_SIZE = 10_000
+USER_CACHE_TTL = 30.0
+_user_cache: Dict[int, Tuple[float, CurrentUser]] = {}
+
+
+def invalidate_user_cache(user_id: int):
+    """Drop a user's cached snapshot after it is modified or deleted"""
+    _user_cache.pop(user_id, None)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
     """Get current user from JWT token"""
     from app.core.database import async_session_maker
     from app.models.user import User
-    from sqlalchemy import select
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,20 +207,44 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except (ValueError, TypeError):
         raise credentials_exception
     
-    async with async_session_maker() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if user is None:
-            raise credentials_exception
-        
-        if not bool(user.is_active):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User account is disabled"
+    now = time.monotonic()
+    entry = _user_cache.get(user_id)
+    if entry is not None and entry[0] > now:
+        user = entry[1]
+    else:
+        async with async_session_maker() as session:
+            row = await session.get(User, user_id)
+            
+            if row is None:
+                _user_cache.pop(user_id, None)
+                raise credentials_exception
+            
+            user = CurrentUser(
+                id=row.id,
+                username=row.username,
+                email=row.email,
+                full_name=row.full_name,
+                role=row.role,
+                is_active=bool(row.is_active),
+                created_at=row.created_at,
+                last_login=row.last_login,
             )
         
-        return user
+        if len(_user_cache) >= USER_CACHE_SIZE:
+            _user_cache.pop(next(iter(_user_cache)))
+        _user_cache[user_id] = (now + USER_CACHE_TTL, user)
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is disabled"
+        )
+    
+    return user
+
+
+# Roles allowed through get_current_operator
+_OPERATOR_ROLES = frozenset({"admin", "operator"})
 
 
 async def get_current_admin(current_user = Depends(get_current_user)):
@@ -113,7 +259,7 @@ async def get_current_admin(current_user = Depends(get_current_user)):
 
 async def get_current_operator(current_user = Depends(get_current_user)):
     """Require operator or admin role"""
-    if current_user.role not in ["admin", "operator"]:
+    if current_user.role not in _OPERATOR_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Operator access required"
@@ -123,33 +269,33 @@ async def get_current_operator(current_user = Depends(get_current_user)):
 
 # Permission definitions
 PERMISSIONS = {
-    "admin": [
+    "admin": frozenset({
         "users:read", "users:write", "users:delete",
         "firewall:read", "firewall:write",
         "routes:read", "routes:write",
         "ports:read", "ports:scan",
         "docker:read", "docker:write",
         "audit:read"
-    ],
-    "operator": [
+    }),
+    "operator": frozenset({
         "firewall:read", "firewall:write",
         "routes:read", "routes:write",
         "ports:read", "ports:scan",
         "docker:read"
-    ],
-    "viewer": [
+    }),
+    "viewer": frozenset({
         "firewall:read",
         "routes:read",
         "ports:read",
         "docker:read"
-    ]
+    })
 }
 
 
+@lru_cache(maxsize=256)
 def has_permission(user_role: str, permission: str) -> bool:
     """Check if a role has a specific permission"""
-    role_permissions = PERMISSIONS.get(user_role, [])
-    return permission in role_permissions
+    return permission in PERMISSIONS.get(user_role, frozenset())
 
 
 def require_permission(permission: str):
@@ -2,7 +2,8 @@
 Audit Log Model
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -13,6 +14,14 @@ class AuditLog(Base):
     """Audit log for tracking user actions"""
     
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Audit listings filter on one of these and sort by newest first
+        Index("ix_audit_user_created", "user_id", "created_at"),
+        Index("ix_audit_resource_created", "resource_type", "created_at"),
+        Index("ix_audit_action_created", "action", "created_at"),
+        # Containment queries on details (PostgreSQL only)
+        Index("ix_audit_details_gin", "details", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -27,7 +36,7 @@ class AuditLog(Base):
     
     # Details
     description = Column(Text, nullable=True)
-    details = Column(JSON, nullable=True)  # Additional JSON data
+    details = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # Additional JSON data
     
     # Request info
     ip_address = Column(String(45), nullable=True)
@@ -3,6 +3,7 @@ User Model
 """
 
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
@@ -24,7 +25,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(100), unique=True, index=True, nullable=False)
-    hashed_password = Column(String(255), nullable=False)
+    # Only needed to check passwords: load with undefer(User.hashed_password)
+    hashed_password = deferred(Column(String(255), nullable=False))
     
     # Profile
     full_name = Column(String(100), nullable=True)
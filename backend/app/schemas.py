@@ -2,8 +2,8 @@
 Pydantic Schemas for API
 """
 
-from pydantic import BaseModel, EmailStr, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -64,16 +64,15 @@ class UserResponse(UserBase):
     created_at: datetime
     last_login: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore", validate_default=False)
 
 
 # ============ Firewall Schemas ============
 
 class FirewallRuleBase(BaseModel):
-    action: str = Field(..., pattern="^(allow|deny|reject|drop|accept|limit)$")
-    direction: str = Field(default="in", pattern="^(in|out|fwd)$")
-    protocol: Optional[str] = Field(default="any", pattern="^(tcp|udp|icmp|any|all)$")
+    action: Literal["allow", "deny", "reject", "drop", "accept", "limit"]
+    direction: Literal["in", "out", "fwd"] = "in"
+    protocol: Optional[Literal["tcp", "udp", "icmp", "any", "all"]] = "any"
     port: Optional[str] = None
     from_ip: Optional[str] = "any"
     to_ip: Optional[str] = "any"
@@ -85,7 +84,7 @@ class UFWRuleCreate(FirewallRuleBase):
 
 
 class IptablesRuleCreate(BaseModel):
-    table: str = "filter"
+    table: Literal["filter", "nat", "mangle", "raw", "security"] = "filter"
     chain: str = "INPUT"
     target: str = "ACCEPT"
     protocol: Optional[str] = None
@@ -108,6 +107,14 @@ class FirewalldRuleCreate(BaseModel):
     permanent: bool = True
 
 
+class NftablesRuleCreate(BaseModel):
+    family: str = "inet"  # ip, ip6, inet, arp, bridge, netdev
+    table: str
+    chain: str
+    rule: str  # nft rule expression, e.g. "tcp dport 22 accept"
+    position: Optional[int] = None
+
+
 class FirewallRuleResponse(BaseModel):
     id: str
     backend: str
@@ -235,8 +242,7 @@ class AuditLogResponse(BaseModel):
     status: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, extra="ignore", validate_default=False)
 
 
 # ============ Dashboard Schemas ============
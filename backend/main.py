@@ -6,15 +6,21 @@ Main entry point for the FastAPI application
 import os
 import uvicorn
 from app import create_app
+from app.core.config import settings
 
 app = create_app()
 
 if __name__ == "__main__":
     port = int(os.environ.get("API_PORT", 8000))
+    # Auto-reload in debug mode; see settings.API_WORKERS before raising workers
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=port,
-        reload=True,
-        log_level="info"
+        reload=settings.DEBUG,
+        workers=1 if settings.DEBUG else settings.API_WORKERS,
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+        access_log=False  # Emitted by AccessLogMiddleware instead
     )